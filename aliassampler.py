@@ -0,0 +1,96 @@
+# -----------------------------------------------------------------------------
+# Import necessary modules
+
+import basefunctions
+
+# =============================================================================
+
+class AliasSampler:
+  """Class which randomly selects values according to a discrete probability
+     distribution in constant time, using the alias method (as described by
+     Michael Vose, A linear algorithm for generating random numbers with a
+     given distribution, IEEE Transactions on Software Engineering, 1991).
+
+     The sampler is initialised with a list of pairs (probability, value), the
+     same format as used for the lists in the 'attr_mod_data_dict' of a data
+     set corruptor. Values with a probability of 0.0 are never selected and
+     are not stored in the sampler. The probabilities do not need to sum to
+     1.0, they are normalised.
+  """
+
+  # ---------------------------------------------------------------------------
+
+  def __init__(self, prob_value_list):
+    """Constructor, build the probability and alias tables.
+    """
+
+    basefunctions.check_is_list('prob_value_list', prob_value_list)
+
+    self.value_list = []  # The values with a positive probability
+    prob_list =       []
+
+    for (prob, value) in prob_value_list:
+      basefunctions.check_is_not_negative('probability', prob)
+      if (prob > 0.0):
+        prob_list.append(prob)
+        self.value_list.append(value)
+
+    if (self.value_list == []):
+      raise Exception, 'No value with a positive probability given'
+
+    self.num_values = len(self.value_list)
+
+    prob_sum = float(sum(prob_list))
+
+    # Scale probabilities so that their average is 1.0, then split them into
+    # those below and those above the average
+    #
+    scaled_prob_list = []
+    for prob in prob_list:
+      scaled_prob_list.append(prob * self.num_values / prob_sum)
+
+    small_list = []
+    large_list = []
+    for i in range(self.num_values):
+      if (scaled_prob_list[i] < 1.0):
+        small_list.append(i)
+      else:
+        large_list.append(i)
+
+    self.prob_list =  [1.0] * self.num_values  # Probability to keep column i
+    self.alias_list = range(self.num_values)   # Otherwise take its alias
+
+    # Fill the column of each small entry with the excess of a large entry
+    #
+    while ((small_list != []) and (large_list != [])):
+      small_i = small_list.pop()
+      large_i = large_list.pop()
+
+      self.prob_list[small_i] =  scaled_prob_list[small_i]
+      self.alias_list[small_i] = large_i
+
+      scaled_prob_list[large_i] += scaled_prob_list[small_i] - 1.0
+      if (scaled_prob_list[large_i] < 1.0):
+        small_list.append(large_i)
+      else:
+        large_list.append(large_i)
+
+    # Entries left over (due to rounding errors) keep their own column, with
+    # the probability of 1.0 set above
+
+  # ---------------------------------------------------------------------------
+
+  def sample(self, rng):
+    """Randomly select a value, using one random number from the given random
+       generator (or the 'random' module).
+    """
+
+    r = rng.random() * self.num_values
+    i = int(r)
+
+    if ((r - i) < self.prob_list[i]):
+      return self.value_list[i]
+    else:
+      return self.value_list[self.alias_list[i]]
+
+# =============================================================================
@@ -0,0 +1,99 @@
+# -----------------------------------------------------------------------------
+# Import necessary modules
+
+import hashlib
+import math
+import struct
+
+import basefunctions
+
+# =============================================================================
+
+class BloomFilter:
+  """Class which keeps a set of strings in a fixed amount of memory, so it can
+     be checked if a string was added before. A string that was added is
+     always found, but a string that was not added is also found with a small
+     likelihood (a false positive).
+
+     The filter is sized for 'capacity' strings so that the likelihood of a
+     false positive is 'error_rate' once all of them are added. It needs
+     about -ln(error_rate) / ln(2)**2 bits per string, for example 1.8 bytes
+     for an error rate of 0.001 (so 360 MB for 200 million strings).
+  """
+
+  # ---------------------------------------------------------------------------
+
+  def __init__(self, capacity, error_rate):
+    """Constructor, create an empty filter for the given number of strings and
+       likelihood of a false positive.
+    """
+
+    basefunctions.check_is_integer('capacity', capacity)
+    basefunctions.check_is_positive('capacity', capacity)
+    basefunctions.check_is_normalised('error_rate', error_rate)
+    basefunctions.check_is_positive('error_rate', error_rate)
+
+    ln2 = math.log(2.0)
+
+    self.capacity =   capacity
+    self.error_rate = error_rate
+    self.num_bits =   max(8, int(math.ceil(-capacity * math.log(error_rate) /
+                                           (ln2 * ln2))))
+    self.num_hashes = max(1, int(round(self.num_bits * ln2 / capacity)))
+    self.bit_array =  bytearray((self.num_bits + 7) / 8)
+
+    self.num_added = 0  # Number of strings added that were not found
+
+  # ---------------------------------------------------------------------------
+
+  def __bit_pos_list__(self, value):
+    """Helper method which returns the positions of the bits of the given
+       string, from two hash values of its MD5 digest (double hashing).
+    """
+
+    (hash1, hash2) = struct.unpack('<QQ', hashlib.md5(value).digest())
+    hash2 |= 1  # Odd, so the positions differ for any number of bits
+
+    num_bits = self.num_bits
+
+    return [(hash1 + i * hash2) % num_bits for i in xrange(self.num_hashes)]
+
+  # ---------------------------------------------------------------------------
+
+  def contains(self, value):
+    """Return True if the given string is in the filter (or is a false
+       positive), otherwise False.
+    """
+
+    bit_array = self.bit_array
+
+    for bit_pos in self.__bit_pos_list__(value):
+      if (bit_array[bit_pos >> 3] & (1 << (bit_pos & 7)) == 0):
+        return False
+
+    return True
+
+  # ---------------------------------------------------------------------------
+
+  def add(self, value):
+    """Add the given string to the filter. Returns True if it was in the
+       filter already (or is a false positive), otherwise False.
+    """
+
+    bit_array = self.bit_array
+    found =     True
+
+    for bit_pos in self.__bit_pos_list__(value):
+      byte_pos = bit_pos >> 3
+      bit_mask = 1 << (bit_pos & 7)
+
+      if (bit_array[byte_pos] & bit_mask == 0):
+        bit_array[byte_pos] |= bit_mask
+        found = False
+
+    if (found == False):
+      self.num_added += 1
+
+    return found
+
+# =============================================================================
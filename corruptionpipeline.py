@@ -0,0 +1,464 @@
+# -----------------------------------------------------------------------------
+# Import necessary modules
+
+import codecs
+import os
+import Queue
+import sys
+import threading
+import time
+
+import basefunctions
+
+# =============================================================================
+
+class CorruptionPipeline:
+  """Class which corrupts the records of a CSV file with a data set corruptor
+     and writes them into another CSV file, in three stages that run at the
+     same time:
+
+       read     A thread which reads and parses the lines of the input file.
+       corrupt  The calling thread, which passes the records through the
+                'corrupt_records_stream' method of the data set corruptor.
+       write    A thread which writes the original records and duplicates
+                into the output file.
+
+     The stages are connected by queues of at most 'queue_size' blocks of
+     'block_size' records each. A stage that finds the next queue full waits
+     until the next stage has taken a block, so only a bounded number of
+     records is held in memory, and the stages run at the pace of the slowest
+     one.
+
+     The first column of the input file is the record identifier, and all
+     records are read (like 'basefunctions.read_csv_file', comment lines
+     starting with # and empty lines are skipped). The output file has the
+     same header line, followed by each original record and its duplicates,
+     in the order of the input file (they are not sorted).
+
+     For each stage the number of records it processed, and the time it was
+     working and waiting for the other stages are kept in 'stage_stats' (see
+     'run'). The stage with the most working time limits the throughput.
+  """
+
+  # ---------------------------------------------------------------------------
+
+  def __init__(self, data_set_corruptor, in_file_name, out_file_name,
+               unicode_encoding='ascii', has_header_line=True,
+               queue_size=100, block_size=1000):
+    """Constructor, set the data set corruptor (which needs to be set up for
+       the number of records in the input file), the names of the input and
+       output files and their Unicode encoding, whether the input file starts
+       with a header line, and the size of the queues.
+    """
+
+    basefunctions.check_is_non_empty_string('in_file_name', in_file_name)
+    basefunctions.check_is_non_empty_string('out_file_name', out_file_name)
+    basefunctions.check_unicode_encoding_exists(unicode_encoding)
+    basefunctions.check_is_flag('has_header_line', has_header_line)
+    basefunctions.check_is_integer('queue_size', queue_size)
+    basefunctions.check_is_positive('queue_size', queue_size)
+    basefunctions.check_is_integer('block_size', block_size)
+    basefunctions.check_is_positive('block_size', block_size)
+
+    self.data_set_corruptor = data_set_corruptor
+    self.in_file_name =       in_file_name
+    self.out_file_name =      out_file_name
+    self.unicode_encoding =   unicode_encoding
+    self.has_header_line =    has_header_line
+    self.queue_size =         queue_size
+    self.block_size =         block_size
+
+    self.stage_stats = {}  # Statistics of the last run
+
+  # ---------------------------------------------------------------------------
+
+  def run(self):
+    """Run the three stages until all records are written into the output
+       file.
+
+       Returns 'stage_stats', a dictionary with a tuple (number of records,
+       seconds working, seconds waiting, records per second working) for each
+       stage ('read', 'corrupt' and 'write').
+    """
+
+    try:
+      in_file = codecs.open(self.in_file_name, encoding=self.unicode_encoding)
+    except:
+      raise IOError, 'Cannot read CSV file "%s"' % (self.in_file_name)
+
+    try:
+      out_file = codecs.open(self.out_file_name, 'w',
+                             encoding=self.unicode_encoding)
+    except:
+      in_file.close()
+      raise IOError, 'Cannot write CSV file "%s"' % (self.out_file_name)
+
+    if (self.has_header_line == True):
+      header_list = basefunctions.str2comma_separated_list(in_file.readline())
+      out_file.write(','.join(header_list) + os.linesep)
+
+    self.in_queue =    Queue.Queue(self.queue_size)  # Records read
+    self.out_queue =   Queue.Queue(self.queue_size)  # Records to be written
+    self.abort_event = threading.Event()  # Set if a stage failed
+    self.error_list =  []  # Exceptions of the reader and writer threads
+
+    self.num_rec_dict =   {'read':0,   'corrupt':0,   'write':0}
+    self.wait_time_dict = {'read':0.0, 'corrupt':0.0, 'write':0.0}
+    self.run_time_dict =  {}
+
+    reader_thread = threading.Thread(target=self.__run_stage__,
+                                     args=('read', self.__read_records__,
+                                           in_file))
+    writer_thread = threading.Thread(target=self.__run_stage__,
+                                     args=('write', self.__write_records__,
+                                           out_file))
+    reader_thread.start()
+    writer_thread.start()
+
+    # A failed stage sets the abort event, which stops the other stages
+    #
+    try:
+      self.__run_stage__('corrupt', self.__corrupt_records__, None)
+    finally:
+      reader_thread.join()
+      writer_thread.join()
+      in_file.close()
+      out_file.close()
+
+    if (self.error_list != []):
+      (exc_type, exc_value, exc_traceback) = self.error_list[0]
+      raise exc_type, exc_value, exc_traceback
+
+    self.stage_stats = {}
+    for stage_name in ['read', 'corrupt', 'write']:
+      num_rec =   self.num_rec_dict[stage_name]
+      wait_time = self.wait_time_dict[stage_name]
+      work_time = max(self.run_time_dict[stage_name] - wait_time, 0.0)
+
+      if (work_time > 0.0):
+        rec_per_sec = num_rec / work_time
+      else:
+        rec_per_sec = 0.0
+
+      self.stage_stats[stage_name] = (num_rec, work_time, wait_time,
+                                      rec_per_sec)
+
+    if (self.data_set_corruptor.verbose == True):
+      print 'Pipeline stages:'
+      for stage_name in ['read', 'corrupt', 'write']:
+        print '  %-8s %d records, %.2f sec working, %.2f sec waiting ' % \
+              ((stage_name,) + self.stage_stats[stage_name][:3]) + \
+              '(%.0f records per second)' % (self.stage_stats[stage_name][3])
+      print
+
+    return self.stage_stats
+
+  # ---------------------------------------------------------------------------
+
+  def __run_stage__(self, stage_name, stage_funct, stage_file):
+    """Helper method which runs the given stage function (with the given
+       file), measures its run time, and keeps its exception if it fails, so
+       the other stages can be stopped.
+    """
+
+    start_time = time.time()
+
+    try:
+      stage_funct(stage_file)
+    except:
+      self.error_list.append(sys.exc_info())
+      self.abort_event.set()
+
+    self.run_time_dict[stage_name] = time.time() - start_time
+
+  # ---------------------------------------------------------------------------
+
+  def __put__(self, stage_name, queue, block):
+    """Helper method which puts the given block of records (or None at the
+       end) into the given queue, waiting while the queue is full. Returns
+       False if the pipeline was stopped because a stage failed.
+    """
+
+    start_time = time.time()
+
+    while (self.abort_event.is_set() == False):
+      try:
+        queue.put(block, True, 0.1)
+        self.wait_time_dict[stage_name] += time.time() - start_time
+        return True
+      except Queue.Full:
+        pass
+
+    return False
+
+  # ---------------------------------------------------------------------------
+
+  def __get__(self, stage_name, queue):
+    """Helper method which returns the next block of records from the given
+       queue, waiting while the queue is empty. Returns None at the end, or if
+       the pipeline was stopped because a stage failed.
+    """
+
+    start_time = time.time()
+
+    while (self.abort_event.is_set() == False):
+      try:
+        block = queue.get(True, 0.1)
+        self.wait_time_dict[stage_name] += time.time() - start_time
+        return block
+      except Queue.Empty:
+        pass
+
+    return None
+
+  # ---------------------------------------------------------------------------
+
+  def __read_records__(self, in_file):
+    """Helper method for the read stage, which puts blocks of pairs (record
+       identifier, record list) into the input queue.
+    """
+
+    block = []
+
+    for line_str in in_file:
+      line_str = line_str.strip()
+      if ((line_str.startswith('#') == True) or (line_str == '')):
+        continue
+
+      line_list = basefunctions.str2comma_separated_list(line_str)
+      block.append((line_list[0], line_list[1:]))
+
+      if (len(block) >= self.block_size):
+        self.num_rec_dict['read'] += len(block)
+        if (self.__put__('read', self.in_queue, block) == False):
+          return
+        block = []
+
+    self.num_rec_dict['read'] += len(block)
+    if (block != []):
+      if (self.__put__('read', self.in_queue, block) == False):
+        return
+    self.__put__('read', self.in_queue, None)
+
+  # ---------------------------------------------------------------------------
+
+  def __corrupt_records__(self, stage_file):
+    """Helper method for the corrupt stage, which passes the records of the
+       input queue through the data set corruptor, and puts blocks of the
+       original records and their duplicates into the output queue.
+    """
+
+    block = []
+
+    for rec in self.data_set_corruptor.corrupt_records_stream( \
+                                                    self.__queue_records__()):
+      block.append(rec)
+
+      if (len(block) >= self.block_size):
+        self.num_rec_dict['corrupt'] += len(block)
+        if (self.__put__('corrupt', self.out_queue, block) == False):
+          return
+        block = []
+
+    self.num_rec_dict['corrupt'] += len(block)
+    if (block != []):
+      if (self.__put__('corrupt', self.out_queue, block) == False):
+        return
+    self.__put__('corrupt', self.out_queue, None)
+
+  # ---------------------------------------------------------------------------
+
+  def __queue_records__(self):
+    """Helper generator which yields the records of the input queue.
+    """
+
+    block = self.__get__('corrupt', self.in_queue)
+
+    while (block != None):
+      for rec in block:
+        yield rec
+      block = self.__get__('corrupt', self.in_queue)
+
+  # ---------------------------------------------------------------------------
+
+  def __write_records__(self, out_file):
+    """Helper method for the write stage, which writes the records of the
+       output queue into the output file.
+    """
+
+    block = self.__get__('write', self.out_queue)
+
+    while (block != None):
+      line_list = []
+      for (rec_id, rec_list) in block:
+        line_list.append(','.join([rec_id] + rec_list) + os.linesep)
+      out_file.write(''.join(line_list))
+
+      self.num_rec_dict['write'] += len(block)
+      block = self.__get__('write', self.out_queue)
+
+# =============================================================================
+
+class CorruptionBuffer:
+  """Class which corrupts the records given by an iterator in a background
+     thread, using the 'corrupt_records_stream' method of a data set
+     corruptor, and keeps the original records and their duplicates in a
+     buffer of at most 'buffer_size' blocks of 'block_size' records.
+
+     The records can be taken from the buffer by iterating over it (which
+     waits for the next record), or in blocks with 'get_block', which can be
+     given a timeout of 0 so an event loop is never stalled while records
+     are corrupted. If the buffer is full the background thread waits until
+     a block has been taken, so a slow consumer holds up the corruption
+     rather than letting the buffer grow.
+
+     The iterator of original records is also read in the background thread.
+     If the corruption fails its exception is raised by 'get_block' (and the
+     iteration). Call 'close' to stop the background thread before all
+     records have been taken.
+  """
+
+  # ---------------------------------------------------------------------------
+
+  def __init__(self, data_set_corruptor, rec_iter, buffer_size=10,
+               block_size=1000):
+    """Constructor, set the data set corruptor (which needs to be set up for
+       the number of records given by the iterator), the iterator of pairs
+       (record identifier, record list), and the size of the buffer, and
+       start the background thread.
+    """
+
+    basefunctions.check_is_integer('buffer_size', buffer_size)
+    basefunctions.check_is_positive('buffer_size', buffer_size)
+    basefunctions.check_is_integer('block_size', block_size)
+    basefunctions.check_is_positive('block_size', block_size)
+
+    self.data_set_corruptor = data_set_corruptor
+    self.rec_iter =           rec_iter
+    self.buffer_size =        buffer_size
+    self.block_size =         block_size
+
+    self.buffer_queue = Queue.Queue(buffer_size)
+    self.abort_event =  threading.Event()  # Set by 'close'
+    self.error_list =   []  # Exception of the background thread
+    self.finished =     False  # True once the end of the buffer was reached
+    self.block =        []  # Block of records being iterated over
+    self.block_i =      0
+
+    self.corrupt_thread = threading.Thread(target=self.__corrupt_records__)
+    self.corrupt_thread.daemon = True
+    self.corrupt_thread.start()
+
+  # ---------------------------------------------------------------------------
+
+  def __iter__(self):
+    """Iterate over the original records and their duplicates, as pairs
+       (record identifier, record list).
+    """
+
+    return self
+
+  # ---------------------------------------------------------------------------
+
+  def next(self):
+    """Return the next record, waiting until it has been corrupted.
+    """
+
+    while (self.block_i >= len(self.block)):
+      block = self.get_block()
+      if (block == None):
+        raise StopIteration
+      self.block =   block
+      self.block_i = 0
+
+    rec = self.block[self.block_i]
+    self.block_i += 1
+
+    return rec
+
+  # ---------------------------------------------------------------------------
+
+  def get_block(self, timeout=None):
+    """Return the next block (list) of records from the buffer. If no block
+       is available after waiting 'timeout' seconds (for ever if it is None)
+       an empty list is returned, and None once all records were returned.
+    """
+
+    if (self.finished == True):
+      return None
+
+    try:
+      if (timeout == None):
+        block = self.buffer_queue.get()
+      else:
+        block = self.buffer_queue.get(timeout > 0, timeout)
+    except Queue.Empty:
+      return []
+
+    if (block == None):  # End of the records, or the corruption failed
+      self.finished = True
+      self.corrupt_thread.join()
+
+      if (self.error_list != []):
+        (exc_type, exc_value, exc_traceback) = self.error_list[0]
+        raise exc_type, exc_value, exc_traceback
+
+    return block
+
+  # ---------------------------------------------------------------------------
+
+  def close(self):
+    """Stop the background thread and discard the records in the buffer.
+    """
+
+    self.abort_event.set()
+    self.corrupt_thread.join()
+
+    self.finished = True
+    self.block =    []
+    self.block_i =  0
+
+  # ---------------------------------------------------------------------------
+
+  def __put__(self, block):
+    """Helper method which puts the given block of records (or None at the
+       end) into the buffer, waiting while it is full. Returns False if the
+       buffer was closed.
+    """
+
+    while (self.abort_event.is_set() == False):
+      try:
+        self.buffer_queue.put(block, True, 0.1)
+        return True
+      except Queue.Full:
+        pass
+
+    return False
+
+  # ---------------------------------------------------------------------------
+
+  def __corrupt_records__(self):
+    """Helper method run by the background thread, which puts blocks of the
+       original records and their duplicates into the buffer.
+    """
+
+    block = []
+
+    try:
+      for rec in self.data_set_corruptor.corrupt_records_stream(self.rec_iter):
+        block.append(rec)
+
+        if (len(block) >= self.block_size):
+          if (self.__put__(block) == False):
+            return
+          block = []
+
+      if (block != []):
+        if (self.__put__(block) == False):
+          return
+    except:
+      self.error_list.append(sys.exc_info())
+
+    self.__put__(None)
+
+# =============================================================================
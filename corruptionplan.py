@@ -0,0 +1,246 @@
+# -----------------------------------------------------------------------------
+# Import necessary modules
+
+import array
+import cPickle
+import hashlib
+
+import basefunctions
+
+# =============================================================================
+
+class CorruptionPlan:
+  """Class which holds the decisions made when duplicates were generated by a
+     data set corruptor in compact tables: for each duplicate the original
+     record it was generated from, its number, the number of earlier tries to
+     generate it, and the modifications applied to it, each as the index of
+     the modified attribute and the index of the corruptor in the list of
+     corruptors of this attribute (in 'attr_mod_data_dict').
+
+     All modifications of a try are listed, including those that did not
+     change a value, as they all draw random values from the stream of their
+     attribute. With the same 'random_seed' the duplicates can therefore be
+     generated again from the plan (see 'apply_plan' of the data set
+     corruptor), without selecting attributes and corruptors again.
+
+     For each original record with duplicates a digest of its values (see
+     'record_digest') is kept, so changed original records can be found when
+     the plan is replayed on a new version of the data set. For each
+     attribute a digest of its corruptors and their probabilities (see
+     'attr_config_digest') is kept in 'attr_config_dict', so the attributes
+     with changed corruptors can be found when the configuration changes.
+
+     The tables are arrays (from the 'array' module):
+
+       dup_org_array    Index into 'org_rec_id_list' for each duplicate.
+       dup_num_array    Number of each duplicate (starting at 0).
+       dup_try_array    Number of earlier tries to generate each duplicate.
+       mod_start_array  Index of the first modification of each duplicate in
+                        the modification tables, with one more entry for the
+                        end of the last duplicate.
+       mod_attr_array   Index of the modified attribute in
+                        'attribute_name_list' for each modification.
+       mod_crpt_array   Index of the corruptor for each modification.
+  """
+
+  # ---------------------------------------------------------------------------
+
+  def __init__(self, attribute_name_list, corruptor_name_dict, random_seed,
+               attr_config_dict=None):
+    """Constructor, create empty tables for the given attribute names, names
+       of corruptors (a dictionary with a list of names for each attribute),
+       seed of the data set corruptor, and digests of the corruptors of each
+       attribute.
+    """
+
+    basefunctions.check_is_list('attribute_name_list', attribute_name_list)
+    basefunctions.check_is_dictionary('corruptor_name_dict',
+                                      corruptor_name_dict)
+
+    self.attribute_name_list = attribute_name_list
+    self.corruptor_name_dict = corruptor_name_dict
+    self.random_seed =         random_seed
+
+    if (attr_config_dict == None):
+      self.attr_config_dict = {}
+    else:
+      basefunctions.check_is_dictionary('attr_config_dict', attr_config_dict)
+      self.attr_config_dict = attr_config_dict
+
+    self.org_rec_id_list = []  # Original records with duplicates
+    self.org_digest_list = []  # Digests of their values
+
+    self.dup_org_array =   array.array('i')
+    self.dup_num_array =   array.array('i')
+    self.dup_try_array =   array.array('i')
+    self.mod_start_array = array.array('i', [0])
+    self.mod_attr_array =  array.array('h')
+    self.mod_crpt_array =  array.array('h')
+
+  # ---------------------------------------------------------------------------
+
+  def add_duplicate(self, org_rec_id, dup_num, dup_try, mod_list,
+                    org_digest=None):
+    """Add a duplicate of the given original record, with the given list of
+       modifications as pairs (attribute index, corruptor index) and the
+       digest of the original record. The duplicates of an original record
+       have to be added one after the other.
+    """
+
+    if ((self.org_rec_id_list == []) or \
+        (self.org_rec_id_list[-1] != org_rec_id)):
+      self.org_rec_id_list.append(org_rec_id)
+      self.org_digest_list.append(org_digest)
+
+    self.dup_org_array.append(len(self.org_rec_id_list)-1)
+    self.dup_num_array.append(dup_num)
+    self.dup_try_array.append(dup_try)
+
+    for (attr_index, crpt_index) in mod_list:
+      self.mod_attr_array.append(attr_index)
+      self.mod_crpt_array.append(crpt_index)
+
+    self.mod_start_array.append(len(self.mod_attr_array))
+
+  # ---------------------------------------------------------------------------
+
+  def num_duplicates(self):
+    """Return the number of duplicates in the plan.
+    """
+
+    return len(self.dup_num_array)
+
+  # ---------------------------------------------------------------------------
+
+  def org_dup_range_dict(self):
+    """Return a dictionary with the index of each original record in
+       'org_rec_id_list' and the range of the indices of its duplicates, as
+       tuples (original index, first duplicate index, end duplicate index).
+    """
+
+    org_dup_range_dict = {}
+
+    start_i = 0
+    for dup_i in xrange(1, self.num_duplicates()+1):
+      if ((dup_i == self.num_duplicates()) or \
+          (self.dup_org_array[dup_i] != self.dup_org_array[start_i])):
+        org_i = self.dup_org_array[start_i]
+        org_dup_range_dict[self.org_rec_id_list[org_i]] = (org_i, start_i,
+                                                           dup_i)
+        start_i = dup_i
+
+    return org_dup_range_dict
+
+  # ---------------------------------------------------------------------------
+
+  def get_duplicate(self, dup_i):
+    """Return the duplicate with the given index in the plan as a tuple
+       (original record identifier, duplicate number, number of earlier tries,
+       list of modifications as pairs (attribute index, corruptor index)).
+    """
+
+    mod_list = []
+    for mod_i in xrange(self.mod_start_array[dup_i],
+                        self.mod_start_array[dup_i+1]):
+      mod_list.append((self.mod_attr_array[mod_i], self.mod_crpt_array[mod_i]))
+
+    return (self.org_rec_id_list[self.dup_org_array[dup_i]],
+            self.dup_num_array[dup_i], self.dup_try_array[dup_i], mod_list)
+
+  # ---------------------------------------------------------------------------
+
+  def describe_duplicate(self, dup_i):
+    """Return the duplicate with the given index like 'get_duplicate', but
+       with the modifications as pairs (attribute name, corruptor name).
+    """
+
+    (org_rec_id, dup_num, dup_try, mod_list) = self.get_duplicate(dup_i)
+
+    mod_name_list = []
+    for (attr_index, crpt_index) in mod_list:
+      attr_name = self.attribute_name_list[attr_index]
+      mod_name_list.append((attr_name,
+                            self.corruptor_name_dict[attr_name][crpt_index]))
+
+    return (org_rec_id, dup_num, dup_try, mod_name_list)
+
+  # ---------------------------------------------------------------------------
+
+  def save(self, file_name):
+    """Write the plan into a file with the given name.
+    """
+
+    basefunctions.check_is_non_empty_string('file_name', file_name)
+
+    try:
+      out_file = open(file_name, 'wb')
+    except:
+      raise IOError, 'Cannot write plan file "%s"' % (file_name)
+
+    cPickle.dump(self.__dict__, out_file, 2)
+    out_file.close()
+
+# -----------------------------------------------------------------------------
+
+def record_digest(rec_list):
+  """Return a digest (a string) of the values in the given record list.
+  """
+
+  return hashlib.md5(repr(rec_list)).hexdigest()
+
+# -----------------------------------------------------------------------------
+
+def attr_config_digest(attr_mod_data_list):
+  """Return a digest (a string) of the given list of pairs (probability,
+     corruptor) of an attribute. It includes the type of each corruptor and
+     its settings (including look-up tables), but not the values kept in its
+     memo, which do not change what it returns.
+  """
+
+  config_list = []
+
+  for (crpt_prob, corruptor) in attr_mod_data_list:
+    setting_list = []
+
+    for (setting_name, setting_val) in sorted(corruptor.__dict__.items()):
+      if (setting_name in ['memo', 'memo_size']):
+        continue
+
+      if (callable(setting_val)):  # Such as a position function
+        setting_val = getattr(setting_val, '__name__', None)
+      elif (isinstance(setting_val, dict)):
+        setting_val = sorted(setting_val.items())
+      elif (isinstance(setting_val, (set, frozenset))):
+        setting_val = sorted(setting_val)
+
+      setting_list.append((setting_name, setting_val))
+
+    config_list.append((crpt_prob, corruptor.__class__.__name__,
+                        setting_list))
+
+  return hashlib.md5(repr(config_list)).hexdigest()
+
+# -----------------------------------------------------------------------------
+
+def load_plan(file_name):
+  """Read a plan written with 'save' from the file with the given name and
+     return it.
+  """
+
+  basefunctions.check_is_non_empty_string('file_name', file_name)
+
+  try:
+    in_file = open(file_name, 'rb')
+    plan_dict = cPickle.load(in_file)
+    in_file.close()
+  except:
+    raise IOError, 'Cannot read plan file "%s"' % (file_name)
+
+  plan = CorruptionPlan(plan_dict['attribute_name_list'],
+                        plan_dict['corruptor_name_dict'],
+                        plan_dict['random_seed'])
+  plan.__dict__.update(plan_dict)
+
+  return plan
+
+# =============================================================================
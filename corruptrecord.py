@@ -1,6 +1,7 @@
 import math
 import random
 import basefunctions
+import keyedrandom
 import positionfunctions
 # ===============================================================================
 # Classes for corrupting a value in a list of attributes (fields) of the data set
@@ -75,6 +76,59 @@ class CorruptRecord:
 
     raise Exception, 'Override abstract method in derived class'
 
+  # ---------------------------------------------------------------------------
+
+  def corrupt_values(self, in_list_list, rng_list=None):
+    """Method which corrupts each record list in the given list and returns a
+       list of the modified record lists. If a list of random streams is
+       given, the i-th record list is corrupted with random values drawn from
+       the i-th stream, otherwise all random values are drawn from the active
+       stream.
+
+       This default implementation calls 'corrupt_value' for each record list,
+       derived classes can override it to corrupt a batch of records faster.
+    """
+
+    rng_list = keyedrandom.stream_list(rng_list, len(in_list_list))
+
+    out_list_list = []
+
+    prev_rng = keyedrandom.get_stream()
+    try:
+      for i in xrange(len(in_list_list)):
+        keyedrandom.set_stream(rng_list[i])
+        out_list_list.append(self.corrupt_value(in_list_list[i]))
+    finally:
+      keyedrandom.set_stream(prev_rng)
+
+    return out_list_list
+
+  # ---------------------------------------------------------------------------
+
+  def can_corrupt(self, in_list):
+    """Method which returns False if the corruptor is certain to return the
+       given record list unchanged, and True if it can modify it.
+
+       This default implementation always returns True, derived classes
+       override it if they know records they cannot modify.
+    """
+
+    return True
+
+  # ---------------------------------------------------------------------------
+
+  def num_variants(self, in_list):
+    """Method which returns an estimate of the number of different record
+       lists (other than the given record list) the corruptor can return for
+       the given record list, or None if this is not known.
+
+       This default implementation returns 1 if the record list can be
+       modified (as the record level corruptors do not draw random values),
+       and 0 otherwise.
+    """
+
+    return int(self.can_corrupt(in_list))
+
 # =============================================================================
 
 class CorruptClearRecord(CorruptRecord):
@@ -132,6 +186,18 @@ class CorruptClearRecord(CorruptRecord):
         new_list[idx] = self.clear_val
     return new_list
 
+  # ---------------------------------------------------------------------------
+
+  def can_corrupt(self, in_list):
+    """Return True if a value in the given record list is not cleared.
+    """
+
+    for val in in_list:
+      if (val != self.clear_val):
+        return True
+
+    return False
+
 # =============================================================================
 #clear_rec = CorruptClearRecord(\
 #       clear_val=' ')
@@ -209,6 +275,15 @@ class CorruptSwapAttributes(CorruptRecord):
 
     return new_list
 
+  # ---------------------------------------------------------------------------
+
+  def can_corrupt(self, in_list):
+    """Return True if the two attributes have different values.
+    """
+
+    return (in_list[attr_name_list.index(self.attr1)] != \
+            in_list[attr_name_list.index(self.attr2)])
+
 # =============================================================================
 # =============================================================================
 #swap_attr = CorruptSwapAttributes(\
@@ -296,22 +371,16 @@ class CorruptOverflowAttributes(CorruptRecord):
     if self.start_pos == 'beginning':
         overflow_len = len(attr2_val) * self.overflow_level
         overflow_len = int(overflow_len)
-        print overflow_len
         new_attr1_val = attr1_val + attr2_val[:overflow_len]
-        print new_attr1_val
         new_attr2_val = attr2_val[overflow_len:]
-        print new_attr2_val
         new_list[attr1_idx] = new_attr1_val
         new_list[attr2_idx] = new_attr2_val
 
     elif self.start_pos == 'ending':
         overflow_len = len(attr1_val) * self.overflow_level
         overflow_len = int(overflow_len)
-        print overflow_len
         new_attr2_val = attr1_val[overflow_len:] + attr2_val
-        print new_attr2_val
         new_attr1_val = attr1_val[:overflow_len]
-        print new_attr1_val
         new_list[attr1_idx] = new_attr1_val
         new_list[attr2_idx] = new_attr2_val
 
@@ -380,6 +449,18 @@ class CorruptMissingRecord(CorruptRecord):
         new_list[idx] = 'missing'
     return new_list
 
+  # ---------------------------------------------------------------------------
+
+  def can_corrupt(self, in_list):
+    """Return True if a value in the given record list is not 'missing'.
+    """
+
+    for val in in_list:
+      if (val != 'missing'):
+        return True
+
+    return False
+
 # =============================================================================
 #missing_rec = CorruptMissingRecord()
 
@@ -434,4 +515,12 @@ class CorruptDuplicateRecord(CorruptRecord):
     new_list[0]=('duplicate')
     return new_list
 
+  # ---------------------------------------------------------------------------
+
+  def can_corrupt(self, in_list):
+    """Return True if the given record list is not marked as a duplicate.
+    """
+
+    return (in_list[0] != 'duplicate')
+
 # =============================================================================
\ No newline at end of file
@@ -2,9 +2,10 @@
 # Import necessary modules
 
 import math
-import random
 import basefunctions
+import keyedrandom
 import positionfunctions
+import valuememo
 # =============================================================================
 # Classes for corrupting a value in a single attribute (field) of the data set
 # =============================================================================
@@ -26,6 +27,15 @@ class CorruptValue:
                         function is assumed to be a string and its return value
                         an integer number in the range of the length of the
                         given input string.
+
+     The following variable can be set when a CorruptValue instance is
+     initialised:
+
+     memo_size          The maximum number of distinct values for which a
+                        corruptor keeps the candidate modifications it
+                        computed (used by the phonetic, OCR and keyboard
+                        corruptors). Default is 10000, 0 means that nothing
+                        is kept.
   """
 
   # ---------------------------------------------------------------------------
@@ -37,6 +47,7 @@ class CorruptValue:
     # General attributes for all attribute corruptors.
     #
     self.position_function = None
+    self.memo_size =         10000
 
     # Process the keyword argument (all keywords specific to a certain data
     # generator type were processed in the derived class constructor)
@@ -50,6 +61,11 @@ class CorruptValue:
         #-----# in this case one of the functions (position_mod_normal or position_mod_uniform)
         self.position_function = value
 
+      elif (keyword.startswith('memo')):
+        basefunctions.check_is_integer('memo_size', value)
+        basefunctions.check_is_not_negative('memo_size', value)
+        self.memo_size = value
+
       else:
         raise Exception, 'Illegal constructor argument keyword: "%s"' % \
               (str(keyword))
@@ -57,6 +73,10 @@ class CorruptValue:
     basefunctions.check_is_function_or_method('position_function',
                                               self.position_function)
 
+    # Candidate modifications computed for values
+    #
+    self.memo = valuememo.ValueMemo(self.memo_size)
+
     # Check if the position function does return an integer value
     #
     pos = self.position_function('test')
@@ -75,6 +95,63 @@ class CorruptValue:
 
     raise Exception, 'Override abstract method in derived class'
 
+  # ---------------------------------------------------------------------------
+
+  def corrupt_values(self, in_str_list, rng_list=None):
+    """Method which corrupts each string in the given list and returns a list
+       of the modified strings. If a list of random streams is given, the i-th
+       string is corrupted with random values drawn from the i-th stream,
+       otherwise all random values are drawn from the active stream.
+
+       This default implementation calls 'corrupt_value' for each string,
+       derived classes override it to corrupt a batch of strings faster.
+    """
+
+    rng_list = keyedrandom.stream_list(rng_list, len(in_str_list))
+
+    out_str_list = []
+
+    prev_rng = keyedrandom.get_stream()
+    try:
+      for i in xrange(len(in_str_list)):
+        keyedrandom.set_stream(rng_list[i])
+        out_str_list.append(self.corrupt_value(in_str_list[i]))
+    finally:
+      keyedrandom.set_stream(prev_rng)
+
+    return out_str_list
+
+  # ---------------------------------------------------------------------------
+
+  def can_corrupt(self, in_str):
+    """Method which returns False if the corruptor is certain to return the
+       given input string unchanged, and True if it can modify it. Data set
+       corruptors use it to only select corruptors that can modify a value.
+
+       This default implementation always returns True, derived classes
+       override it if they know values they cannot modify.
+    """
+
+    return True
+
+  # ---------------------------------------------------------------------------
+
+  def num_variants(self, in_str):
+    """Method which returns an estimate of the number of different strings
+       (other than the given input string) the corruptor can return for the
+       given input string, or None if this is not known. Data set corruptors
+       use it to find original records for which not enough different
+       duplicates can be generated.
+
+       This default implementation returns 0 if the string cannot be
+       modified, and None otherwise.
+    """
+
+    if (self.can_corrupt(in_str) == False):
+      return 0
+
+    return None
+
 # =============================================================================
 
 class CorruptMissingValue(CorruptValue):
@@ -130,6 +207,30 @@ class CorruptMissingValue(CorruptValue):
 
     return self.missing_val
 
+  # ---------------------------------------------------------------------------
+
+  def corrupt_values(self, in_str_list, rng_list=None):
+    """Return the missing value string for each string in the given list.
+    """
+
+    return [self.missing_val] * len(in_str_list)
+
+  # ---------------------------------------------------------------------------
+
+  def can_corrupt(self, in_str):
+    """Return True if the given string is not the missing value string.
+    """
+
+    return (in_str != self.missing_val)
+
+  # ---------------------------------------------------------------------------
+
+  def num_variants(self, in_str):
+    """Return 1 if the given string is not the missing value string.
+    """
+
+    return int(self.can_corrupt(in_str))
+
 # =============================================================================
 
 class CorruptValueEdit(CorruptValue):
@@ -233,80 +334,156 @@ class CorruptValueEdit(CorruptValue):
        string where to apply this edit.
     """
 
-    if (len(in_str) == 0):  # Empty string, no modification possible
-      return in_str
+    return self.corrupt_values([in_str])[0]
 
-    # Randomly select an edit operation
-    #
-    r = random.random()
-
-    if (r < self.insert_range[1]):
-      edit_op = 'ins'
-    elif ((r >= self.delete_range[0]) and (r < self.delete_range[1])):
-      edit_op = 'del'
-    elif ((r >= self.substitute_range[0]) and (r < self.substitute_range[1])):
-      edit_op = 'sub'
-    else:
-      edit_op = 'tra'
+  # ---------------------------------------------------------------------------
 
-    # Do some checks if only a valid edit operations was selected
-    #
-    if (edit_op == 'ins'):
-      assert self.insert_prob > 0.0
-    elif (edit_op == 'del'):
-      assert self.delete_prob > 0.0
-    elif (edit_op == 'sub'):
-      assert self.substitute_prob > 0.0
-    else:
-      assert self.transpose_prob > 0.0
+  def can_corrupt(self, in_str):
+    """Return True if the given string is not empty and there are characters
+       that can be inserted or substituted into it.
+    """
 
-    # If the input string is empty only insert is possible
-    #
-    if ((len(in_str) == 0) and (edit_op != 'ins')):
-      return in_str  # Return input string without modification
+    return ((len(in_str) > 0) and (self.char_set_funct(in_str) != ''))
 
-    # If the input string only has one character then transposition is not
-    # possible
-    #
-    if ((len(in_str) == 1) and (edit_op == 'tra')):
-      return in_str  # Return input string without modification
+  # ---------------------------------------------------------------------------
 
-    # Position in string where to apply the modification
-    #
-    # For a transposition we cannot select the last position in the string
-    # while for an insert we can specify the position after the last
-    if (edit_op == 'tra'):
-      len_in_str = in_str[:-1]
-    elif (edit_op == 'ins'):
-      len_in_str = in_str+'x'
-    else:
-      len_in_str = in_str
-    mod_pos = self.position_function(len_in_str)
+  def num_variants(self, in_str):
+    """Return the number of edits of the given string with edit operations
+       that have a probability larger than 0.0.
+    """
+
+    if (self.can_corrupt(in_str) == False):
+      return 0
+
+    len_in_str =   len(in_str)
+    len_char_set = len(self.char_set_funct(in_str))
+
+    num_variants = 0
+    if (self.insert_prob > 0.0):
+      num_variants += (len_in_str + 1) * len_char_set
+    if (self.delete_prob > 0.0):
+      num_variants += len_in_str
+    if (self.substitute_prob > 0.0):
+      num_variants += len_in_str * len_char_set
+    if (self.transpose_prob > 0.0):
+      num_variants += len_in_str - 1
+
+    return num_variants
+
+  # ---------------------------------------------------------------------------
+
+  def corrupt_values(self, in_str_list, rng_list=None):
+    """Method which corrupts each string in the given list as described in
+       'corrupt_value'. The edit operations for all strings are randomly
+       selected first, then the edits are applied.
+    """
+
+    num_str =  len(in_str_list)
+    rng_list = keyedrandom.stream_list(rng_list, num_str)
 
-    # Get the set of possible characters that can be inserted or substituted
+    # Randomly select an edit operation for each string (no modification is
+    # possible for an empty string)
     #
-    char_set = self.char_set_funct(in_str)
+    insert_end =   self.insert_range[1]
+    delete_range = self.delete_range
+    subst_range =  self.substitute_range
 
-    if (char_set == ''):  # No possible value change
-      return in_str
+    edit_op_list = []
 
-    if (edit_op == 'ins'):  # Insert a character
-      ins_char = random.choice(char_set)
-      new_str = in_str[:mod_pos] + ins_char + in_str[mod_pos:]
+    for i in xrange(num_str):
+      if (len(in_str_list[i]) == 0):
+        edit_op_list.append(None)
+        continue
 
-    elif (edit_op == 'del'):  # Delete a character
-      new_str = in_str[:mod_pos] + in_str[mod_pos+1:]
+      r = rng_list[i].random()
 
-    elif (edit_op == 'sub'):  # Substitute a character
-      sub_char = random.choice(char_set)
-      new_str = in_str[:mod_pos] + sub_char + in_str[mod_pos+1:]
+      if (r < insert_end):
+        edit_op = 'ins'
+      elif ((r >= delete_range[0]) and (r < delete_range[1])):
+        edit_op = 'del'
+      elif ((r >= subst_range[0]) and (r < subst_range[1])):
+        edit_op = 'sub'
+      else:
+        edit_op = 'tra'
 
-    else:  # Transpose two characters
-      char1 = in_str[mod_pos]
-      char2 = in_str[mod_pos+1]
-      new_str = in_str[:mod_pos]+char2+char1+in_str[mod_pos+2:]
+      # Do some checks if only a valid edit operations was selected
+      #
+      if (edit_op == 'ins'):
+        assert self.insert_prob > 0.0
+      elif (edit_op == 'del'):
+        assert self.delete_prob > 0.0
+      elif (edit_op == 'sub'):
+        assert self.substitute_prob > 0.0
+      else:
+        assert self.transpose_prob > 0.0
 
-    return new_str
+      edit_op_list.append(edit_op)
+
+    position_function = self.position_function
+    char_set_funct =    self.char_set_funct
+
+    out_str_list = []
+
+    prev_rng = keyedrandom.get_stream()
+    try:
+      for i in xrange(num_str):
+        in_str =  in_str_list[i]
+        edit_op = edit_op_list[i]
+
+        # If the input string is empty or only has one character for a
+        # transposition it cannot be modified
+        #
+        if ((edit_op == None) or ((len(in_str) == 1) and (edit_op == 'tra'))):
+          out_str_list.append(in_str)  # Input string without modification
+          continue
+
+        rng = rng_list[i]
+        keyedrandom.set_stream(rng)  # Also used by the position function
+
+        # Position in string where to apply the modification
+        #
+        # For a transposition we cannot select the last position in the
+        # string while for an insert we can specify the position after the
+        # last
+        if (edit_op == 'tra'):
+          len_in_str = in_str[:-1]
+        elif (edit_op == 'ins'):
+          len_in_str = in_str+'x'
+        else:
+          len_in_str = in_str
+        mod_pos = position_function(len_in_str)
+
+        # Get the set of possible characters that can be inserted or
+        # substituted
+        #
+        char_set = char_set_funct(in_str)
+
+        if (char_set == ''):  # No possible value change
+          out_str_list.append(in_str)
+          continue
+
+        if (edit_op == 'ins'):  # Insert a character
+          ins_char = rng.choice(char_set)
+          new_str = in_str[:mod_pos] + ins_char + in_str[mod_pos:]
+
+        elif (edit_op == 'del'):  # Delete a character
+          new_str = in_str[:mod_pos] + in_str[mod_pos+1:]
+
+        elif (edit_op == 'sub'):  # Substitute a character
+          sub_char = rng.choice(char_set)
+          new_str = in_str[:mod_pos] + sub_char + in_str[mod_pos+1:]
+
+        else:  # Transpose two characters
+          char1 = in_str[mod_pos]
+          char2 = in_str[mod_pos+1]
+          new_str = in_str[:mod_pos]+char2+char1+in_str[mod_pos+2:]
+
+        out_str_list.append(new_str)
+
+    finally:
+      keyedrandom.set_stream(prev_rng)
+
+    return out_str_list
 
 # =============================================================================
 
@@ -400,50 +577,127 @@ class CorruptValueKeyboard(CorruptValue):
        layout at a position randomly selected by the position function.
     """
 
-    if (len(in_str) == 0):  # Empty string, no modification possible
-      return in_str
+    return self.corrupt_values([in_str])[0]
+
+  # ---------------------------------------------------------------------------
+
+  def can_corrupt(self, in_str):
+    """Return True if the given string contains a character that has a
+       neighbouring character on the keyboard.
+    """
+
+    rows = self.rows
+    cols = self.cols
+
+    for c in in_str:
+      if ((c in rows) or (c in cols)):
+        return True
+
+    return False
+
+  # ---------------------------------------------------------------------------
+
+  def num_variants(self, in_str):
+    """Return the number of neighbouring keys of all characters in the given
+       string.
+    """
+
+    num_variants = 0
+    for c in in_str:
+      num_variants += len(self.rows.get(c, '')) + len(self.cols.get(c, ''))
+
+    return num_variants
+
+  # ---------------------------------------------------------------------------
+
+  def __keyboard_candidates__(self, in_str, pos):
+    """Helper method which returns a pair of lists of the strings where the
+       character at the given position in the given string is replaced with a
+       neighbouring character in the same row and in the same column of the
+       keyboard (None if there is no such character).
+    """
+
+    org_char = in_str[pos]
+
+    row_str_list = None
+    if (org_char in self.rows):
+      row_str_list = []
+      for new_char in self.rows[org_char]:
+        row_str_list.append(in_str[:pos] + new_char + in_str[pos+1:])
+
+    col_str_list = None
+    if (org_char in self.cols):
+      col_str_list = []
+      for new_char in self.cols[org_char]:
+        col_str_list.append(in_str[:pos] + new_char + in_str[pos+1:])
+
+    return (row_str_list, col_str_list)
+
+  # ---------------------------------------------------------------------------
+
+  def corrupt_values(self, in_str_list, rng_list=None):
+    """Method which corrupts each string in the given list as described in
+       'corrupt_value'. The possible modifications at a position are computed
+       once for each distinct string (and kept in the memo of the corruptor).
+    """
+
+    rng_list = keyedrandom.stream_list(rng_list, len(in_str_list))
 
     max_try = 10  # Maximum number of tries to find a keyboard modification at
                   # a randomly selected position
 
-    done_key_mod = False  # A flag, set to true once a modification is done
-    try_num =      0
+    position_function = self.position_function
+    row_prob =          self.row_prob
+    memo =              self.memo
 
-    mod_str = in_str[:]  # Make a copy of the string which will be modified
+    out_str_list = []
 
-    while ((done_key_mod == False) and (try_num < max_try)):
+    prev_rng = keyedrandom.get_stream()
+    try:
+      for i in xrange(len(in_str_list)):
+        in_str = in_str_list[i]
 
-      mod_pos =  self.position_function(mod_str)
-      mod_char = mod_str[mod_pos]
+        if (len(in_str) == 0):  # Empty string, no modification possible
+          out_str_list.append(in_str)
+          continue
 
-      r = random.random()  # Create a random number between 0 and 1
+        rng = rng_list[i]
+        keyedrandom.set_stream(rng)  # Also used by the position function
 
-      if (r <= self.row_prob):  # See if there is a row modification
-        if (mod_char in self.rows):
-          key_mod_chars = self.rows[mod_char]
-          done_key_mod =  True
+        key_mod_str_list = None  # Set once a modification is found
+        try_num =          0
 
-      else:  # See if there is a column modification
-        if (mod_char in self.cols):
-          key_mod_chars = self.cols[mod_char]
-          done_key_mod =  True
+        while ((key_mod_str_list == None) and (try_num < max_try)):
 
-      if (done_key_mod == False):
-        try_num += 1
+          mod_pos =  position_function(in_str)
+          cand_pair = memo.get(in_str, mod_pos, self.__keyboard_candidates__)
 
-    # If a modification is possible do it
-    #
-    if (done_key_mod == True):
+          r = rng.random()  # Create a random number between 0 and 1
 
-      # Randomly select one of the possible characters
-      #
-      new_char = random.choice(key_mod_chars)
+          if (r <= row_prob):  # See if there is a row modification
+            key_mod_str_list = cand_pair[0]
+          else:  # See if there is a column modification
+            key_mod_str_list = cand_pair[1]
 
-      mod_str = mod_str[:mod_pos] + new_char + mod_str[mod_pos+1:]
+          if (key_mod_str_list == None):
+            try_num += 1
 
-    assert len(mod_str) == len(in_str)
+        # If a modification is possible do it by randomly selecting one of the
+        # possible characters
+        #
+        if (key_mod_str_list != None):
+          mod_str = rng.choice(key_mod_str_list)
+        else:
+          mod_str = in_str
+
+        assert len(mod_str) == len(in_str)
+
+        out_str_list.append(mod_str)
 
-    return mod_str
+    finally:
+      keyedrandom.set_stream(prev_rng)
+
+    return out_str_list
 
 # =============================================================================
 
@@ -573,51 +827,120 @@ class CorruptValueOCR(CorruptValue):
        If there are several OCR variations then one will be randomly chosen.
     """
 
-    if (len(in_str) == 0):  # Empty string, no modification possible
-      return in_str
+    return self.corrupt_values([in_str])[0]
+
+  # ---------------------------------------------------------------------------
+
+  def can_corrupt(self, in_str):
+    """Return True if the given string contains one to three characters that
+       have an OCR variation.
+    """
+
+    ocr_val_dict = self.ocr_val_dict
+
+    for pos in xrange(len(in_str)):
+      for ocr_len in [1, 2, 3]:
+        if (in_str[pos:pos+ocr_len] in ocr_val_dict):
+          return True
+
+    return False
+
+  # ---------------------------------------------------------------------------
+
+  def num_variants(self, in_str):
+    """Return the number of OCR variations at all positions in the given
+       string.
+    """
+
+    num_variants = 0
+    for pos in xrange(len(in_str)):
+      num_variants += len(self.memo.get(in_str, pos, self.__ocr_candidates__))
+
+    return num_variants
+
+  # ---------------------------------------------------------------------------
+
+  def __ocr_candidates__(self, in_str, pos):
+    """Helper method which returns the list of strings where one to three
+       characters at the given position in the given string are replaced with
+       an OCR variation (an empty list if there is none).
+    """
+
+    ocr_val_dict = self.ocr_val_dict
+
+    # Try one to three characters at this position
+    #
+    ocr_org_char_set = set([in_str[pos], in_str[pos:pos+2], in_str[pos:pos+3]])
+
+    mod_str_list = []  # List of possible modifications at this position
+
+    for ocr_org_char in ocr_org_char_set:
+      if ocr_org_char in ocr_val_dict:
+        for mod_val in ocr_val_dict[ocr_org_char]:
+          assert mod_val in ocr_val_dict
+          mod_str_list.append(in_str[:pos] + mod_val + \
+                              in_str[pos+len(ocr_org_char):])
+
+    return mod_str_list
+
+  # ---------------------------------------------------------------------------
+
+  def corrupt_values(self, in_str_list, rng_list=None):
+    """Method which corrupts each string in the given list as described in
+       'corrupt_value'. The possible modifications at a position are computed
+       once for each distinct string (and kept in the memo of the corruptor).
+    """
+
+    rng_list = keyedrandom.stream_list(rng_list, len(in_str_list))
 
     max_try = 10  # Maximum number of tries to find an OCR modification at a
                   # randomly selected position
 
-    done_ocr_mod = False  # A flag, set to True once a modification is done
-    try_num =      0
+    position_function = self.position_function
+    memo =              self.memo
 
-    mod_str = in_str[:]  # Make a copy of the string which will be modified
+    out_str_list = []
 
-    while ((done_ocr_mod == False) and (try_num < max_try)):
+    prev_rng = keyedrandom.get_stream()
+    try:
+      for i in xrange(len(in_str_list)):
+        in_str = in_str_list[i]
 
-      mod_pos = self.position_function(mod_str)
+        if (len(in_str) == 0):  # Empty string, no modification possible
+          out_str_list.append(in_str)
+          continue
 
-      # Try one to three characters at selected position
-      #
-      ocr_org_char_set = set([mod_str[mod_pos], mod_str[mod_pos:mod_pos+2], \
-                              mod_str[mod_pos:mod_pos+3]])
+        rng = rng_list[i]
+        keyedrandom.set_stream(rng)  # Also used by the position function
 
-      mod_options = []  # List of possible modifications that can be applied
+        done_ocr_mod = False  # A flag, set to True once a modification is done
+        try_num =      0
 
-      for ocr_org_char in ocr_org_char_set:
-        if ocr_org_char in self.ocr_val_dict:
-          ocr_var_list = self.ocr_val_dict[ocr_org_char]
-          for mod_val in ocr_var_list:
-            mod_options.append([ocr_org_char,len(ocr_org_char),mod_val])
+        mod_str = in_str
 
-      if (mod_options != []):  # Modifications are possible
+        while ((done_ocr_mod == False) and (try_num < max_try)):
 
-        # Randomly select one of the possible modifications that can be applied
-        #
-        mod_to_apply = random.choice(mod_options)
-        assert mod_to_apply[0] in self.ocr_val_dict.keys()
-        assert mod_to_apply[2] in self.ocr_val_dict.keys()
+          mod_pos =      position_function(in_str)
+          mod_str_list = memo.get(in_str, mod_pos, self.__ocr_candidates__)
 
-        mod_str = in_str[:mod_pos] + mod_to_apply[2] + \
-                  in_str[mod_pos+mod_to_apply[1]:]
+          if (mod_str_list != []):  # Modifications are possible
 
-        done_ocr_mod = True
+            # Randomly select one of the possible modifications that can be
+            # applied
+            #
+            mod_str = rng.choice(mod_str_list)
 
-      else:
-        try_num += 1
+            done_ocr_mod = True
+
+          else:
+            try_num += 1
 
-    return mod_str
+        out_str_list.append(mod_str)
+
+    finally:
+      keyedrandom.set_stream(prev_rng)
+
+    return out_str_list
 
 # =============================================================================
 
@@ -1115,6 +1438,34 @@ class CorruptValuePhonetic(CorruptValue):
 
   # ---------------------------------------------------------------------------
 
+  def __phonetic_candidates__(self, in_str, change_op):
+    """Helper method which returns the list of possible phonetic modifications
+       of the given string if the given modification is None (or None if no
+       modification is possible), otherwise the string resulting from the
+       given modification (the string itself for an empty modification).
+    """
+
+    if (change_op == None):
+
+      # Get the possible phonetic modifications for this input string
+      #
+      phonetic_changes = self.__get_transformation__(in_str)
+
+      if (',' not in phonetic_changes):
+        return None
+
+      tmp_str = phonetic_changes.split(',')
+      pc = tmp_str[1][:-1] # Remove the last ';'
+
+      return pc.split(';')
+
+    if (change_op == ''):
+      return in_str
+
+    return self.__apply_change__(in_str, change_op)
+
+  # ---------------------------------------------------------------------------
+
   def corrupt_value(self, in_str):
     """Method which corrupts the given input string by applying a phonetic
        modification.
@@ -1123,25 +1474,64 @@ class CorruptValuePhonetic(CorruptValue):
        selected.
     """
 
-    if (len(in_str) == 0):  # Empty string, no modification possible
-      return in_str
+    return self.corrupt_values([in_str])[0]
 
-    # Get the possible phonetic modifications for this input string
-    #
-    phonetic_changes = self.__get_transformation__(in_str)
+  # ---------------------------------------------------------------------------
 
-    mod_str = in_str
+  def can_corrupt(self, in_str):
+    """Return True if there are phonetic modifications for the given string
+       (these are kept in the memo of the corruptor, as in 'corrupt_values').
+    """
 
-    if (',' in phonetic_changes):  # Several modifications possible
-      tmp_str = phonetic_changes.split(',')
-      pc = tmp_str[1][:-1] # Remove the last ';'
-      list_pc = pc.split(';')
-      change_op = random.choice(list_pc)
-      if (change_op != ''):
-        mod_str = self.__apply_change__(in_str, change_op)
-        #print in_str, mod_str, change_op
+    if (len(in_str) == 0):
+      return False
+
+    return (self.memo.get(in_str, None, self.__phonetic_candidates__) != None)
+
+  # ---------------------------------------------------------------------------
+
+  def num_variants(self, in_str):
+    """Return the number of different phonetic modifications of the given
+       string.
+    """
+
+    if (self.can_corrupt(in_str) == False):
+      return 0
 
-    return mod_str
+    return len(set(self.memo.get(in_str, None, self.__phonetic_candidates__)))
+
+  # ---------------------------------------------------------------------------
+
+  def corrupt_values(self, in_str_list, rng_list=None):
+    """Method which corrupts each string in the given list as described in
+       'corrupt_value'. The possible modifications and their results are
+       computed once for each distinct string (and kept in the memo of the
+       corruptor).
+    """
+
+    rng_list = keyedrandom.stream_list(rng_list, len(in_str_list))
+
+    memo = self.memo
+
+    out_str_list = []
+
+    for i in xrange(len(in_str_list)):
+      in_str = in_str_list[i]
+
+      if (len(in_str) == 0):  # Empty string, no modification possible
+        out_str_list.append(in_str)
+        continue
+
+      list_pc = memo.get(in_str, None, self.__phonetic_candidates__)
+
+      if (list_pc != None):  # Several modifications possible
+        change_op = rng_list[i].choice(list_pc)
+        out_str_list.append(memo.get(in_str, change_op,
+                                     self.__phonetic_candidates__))
+      else:
+        out_str_list.append(in_str)
+
+    return out_str_list
 
 # =============================================================================
 
@@ -1267,6 +1657,8 @@ class CorruptCategoricalValue(CorruptValue):
        then one will be randomly selected.
     """
 
+    rng = keyedrandom.get_stream()  # Random stream to draw values from
+
     if (len(in_str) == 0):  # Empty string, no modification possible
       return in_str
 
@@ -1275,7 +1667,24 @@ class CorruptCategoricalValue(CorruptValue):
 
     misspell_list = self.misspell_dict[in_str]
 
-    return random.choice(misspell_list)
+    return rng.choice(misspell_list)
+
+  # ---------------------------------------------------------------------------
+
+  def can_corrupt(self, in_str):
+    """Return True if there is a known misspelling for the given string.
+    """
+
+    return (in_str in self.misspell_dict)
+
+  # ---------------------------------------------------------------------------
+
+  def num_variants(self, in_str):
+    """Return the number of different known misspellings of the given
+       string.
+    """
+
+    return len(set(self.misspell_dict.get(in_str, [])))
 
 
 # =============================================================================
@@ -1316,11 +1725,56 @@ class CorruptUnknownCharacter(CorruptValue):
        string by randomly selecting an edit operation and position in the
        string where to apply this edit.
     """
-    if (len(in_str) == 0):  # Empty string, no modification possible
-      return in_str
-    mod_pos = self.position_function(in_str)
-    new_str = in_str[:mod_pos] + self.unknown_char + in_str[mod_pos + 1:]
-    return new_str
+    return self.corrupt_values([in_str])[0]
+
+  def corrupt_values(self, in_str_list, rng_list=None):
+    """Method which corrupts each string in the given list as described in
+       'corrupt_value'.
+    """
+    rng_list = keyedrandom.stream_list(rng_list, len(in_str_list))
+
+    position_function = self.position_function
+    unknown_char =      self.unknown_char
+
+    out_str_list = []
+
+    prev_rng = keyedrandom.get_stream()
+    try:
+      for i in xrange(len(in_str_list)):
+        in_str = in_str_list[i]
+        if (len(in_str) == 0):  # Empty string, no modification possible
+          out_str_list.append(in_str)
+          continue
+        keyedrandom.set_stream(rng_list[i])  # Used by the position function
+        mod_pos = position_function(in_str)
+        out_str_list.append(in_str[:mod_pos] + unknown_char + \
+                            in_str[mod_pos + 1:])
+    finally:
+      keyedrandom.set_stream(prev_rng)
+
+    return out_str_list
+
+  def can_corrupt(self, in_str):
+    """Return True if the given string is not empty and not only made of
+       unknown characters.
+    """
+
+    if (len(in_str) == 0):
+      return False
+
+    return ((len(self.unknown_char) != 1) or \
+            (in_str != self.unknown_char * len(in_str)))
+
+
+  def num_variants(self, in_str):
+    """Return the number of characters in the given string that can be
+       replaced with the unknown character.
+    """
+
+    if (len(self.unknown_char) != 1):
+      return len(in_str)
+
+    return len(in_str) - in_str.count(self.unknown_char)
 
 class CorruptAbbreviatedNameForms(CorruptValue):
 
@@ -1363,6 +1817,19 @@ class CorruptAbbreviatedNameForms(CorruptValue):
     new_str = in_str[:self.num_of_char]
     return new_str
 
+  def can_corrupt(self, in_str):
+    """Return True if the given string is longer than the abbreviation.
+    """
+
+    return (len(in_str) > self.num_of_char)
+
+
+  def num_variants(self, in_str):
+    """Return 1 if the given string is longer than the abbreviation.
+    """
+
+    return int(self.can_corrupt(in_str))
+
 # =============================================================================
 
 class CorruptCategoricalDomain(CorruptValue):
@@ -1397,19 +1864,56 @@ class CorruptCategoricalDomain(CorruptValue):
     #
     basefunctions.check_is_list('categories_list',
                                               self.categories_list)
+
+    self.category_set = set(self.categories_list)  # For fast look-ups
   def corrupt_value(self, in_str):
     """Method which corrupts the given input string and returns the modified
        string by randomly selecting an edit operation and position in the
        string where to apply this edit.
     """
-    if in_str not in self.categories_list:
-      return in_str
-    #cat_list = self.categories_list
-    if in_str in self.categories_list:
+
+    return self.corrupt_values([in_str])[0]
+
+  def corrupt_values(self, in_str_list, rng_list=None):
+    """Method which corrupts each string in the given list as described in
+       'corrupt_value'.
+    """
+
+    rng_list = keyedrandom.stream_list(rng_list, len(in_str_list))
+
+    categories_list = self.categories_list
+    category_set =    self.category_set
+
+    out_str_list = []
+
+    for i in xrange(len(in_str_list)):
+      in_str = in_str_list[i]
       new_str = in_str
-      while new_str == in_str:
-        new_str = random.choice(self.categories_list)
-      return new_str
+      if in_str in category_set:
+        rng = rng_list[i]
+        while new_str == in_str:
+          new_str = rng.choice(categories_list)
+      out_str_list.append(new_str)
+
+    return out_str_list
+
+  def can_corrupt(self, in_str):
+    """Return True if the given string is one of the categories and there is
+       another category.
+    """
+
+    return ((in_str in self.category_set) and (len(self.category_set) > 1))
+
+
+  def num_variants(self, in_str):
+    """Return the number of other categories if the given string is one of
+       the categories.
+    """
+
+    if (in_str not in self.category_set):
+      return 0
+
+    return len(self.category_set) - 1
 
 
 
@@ -1477,6 +1981,8 @@ class CorruptDate(CorruptValue):
        string by randomly selecting an edit operation and position in the
        string where to apply this edit.
     """
+
+    rng = keyedrandom.get_stream()  # Random stream to draw values from
     if self.date_order == "dd-mm-yyyy":
       day, month, year = in_str.split(self.separator)
       day = day.zfill(2)
@@ -1495,10 +2001,10 @@ class CorruptDate(CorruptValue):
     else:
       print "date format and order is not correct"
 
-    comp_mod = random.choice(self.components_to_modify)
-    crpt_method = random.choice(self.date_corruption_methods)
+    comp_mod = rng.choice(self.components_to_modify)
+    crpt_method = rng.choice(self.date_corruption_methods)
 
-    ran_num = random.randint(1, 10)
+    ran_num = rng.randint(1, 10)
 
     if crpt_method == 'add':
       if comp_mod == 'day':
@@ -1528,20 +2034,19 @@ class CorruptDate(CorruptValue):
 
     elif crpt_method == "random":
       if comp_mod == "day":
-        ran_day = random.randint(1, 30)
+        ran_day = rng.randint(1, 30)
         day = ran_day
       elif comp_mod == "month":
-        ran_month = random.randint(1, 12)
+        ran_month = rng.randint(1, 12)
         month = ran_month
       elif comp_mod == "year":
-        ran_year = random.randint(1750, 2100)
+        ran_year = rng.randint(1750, 2100)
         year = ran_year
 
     elif crpt_method == "swap_comp":
       if comp_mod == "day":
         other_comp = ['month', 'year']
-        swap_attr = random.choice(other_comp)
-        print swap_attr
+        swap_attr = rng.choice(other_comp)
         if swap_attr == "month":
           h_day = day
           day = month
@@ -1552,8 +2057,7 @@ class CorruptDate(CorruptValue):
           year = h_day
       elif comp_mod == "month":
         other_comp = ['day', 'year']
-        swap_attr = random.choice(other_comp)
-        print swap_attr
+        swap_attr = rng.choice(other_comp)
         if swap_attr == "day":
           h_month = month
           month = day
@@ -1564,8 +2068,7 @@ class CorruptDate(CorruptValue):
           year = h_month
       elif comp_mod == "year":
         other_comp = ['day', 'month']
-        swap_attr = random.choice(other_comp)
-        print swap_attr
+        swap_attr = rng.choice(other_comp)
         if swap_attr == "day":
           h_year = year
           year = day
@@ -1578,55 +2081,34 @@ class CorruptDate(CorruptValue):
     elif crpt_method == "swap_digit":
       if comp_mod == "day":
         comp_lst = list(day)
-        print comp_lst
         index_lst = range(0, len(comp_lst))
-        print index_lst
-        swap_lst = sorted(random.sample(index_lst, 2))
-        print swap_lst
+        swap_lst = sorted(rng.sample(index_lst, 2))
         fst_index = comp_lst[swap_lst[0]]
-        print fst_index
         snd_index = comp_lst[swap_lst[1]]
-        print snd_index
         comp_lst[swap_lst[0]] = snd_index
         comp_lst[swap_lst[1]] = fst_index
         new_comp = ''.join(comp_lst)
-        print comp_lst
-        print new_comp
         day = new_comp
 
       elif comp_mod == "month":
         comp_lst = list(month)
-        print comp_lst
         index_lst = range(0, len(comp_lst))
-        print index_lst
-        swap_lst = sorted(random.sample(index_lst, 2))
-        print swap_lst
+        swap_lst = sorted(rng.sample(index_lst, 2))
         fst_index = comp_lst[swap_lst[0]]
-        print fst_index
         snd_index = comp_lst[swap_lst[1]]
-        print snd_index
         comp_lst[swap_lst[0]] = snd_index
         comp_lst[swap_lst[1]] = fst_index
         new_comp = ''.join(comp_lst)
-        print comp_lst
-        print new_comp
         month = new_comp
       elif comp_mod == "year":
         comp_lst = list(year)
-        print comp_lst
         index_lst = range(0, len(comp_lst))
-        print index_lst
-        swap_lst = sorted(random.sample(index_lst, 2))
-        print swap_lst
+        swap_lst = sorted(rng.sample(index_lst, 2))
         fst_index = comp_lst[swap_lst[0]]
-        print fst_index
         snd_index = comp_lst[swap_lst[1]]
-        print snd_index
         comp_lst[swap_lst[0]] = snd_index
         comp_lst[swap_lst[1]] = fst_index
         new_comp = ''.join(comp_lst)
-        print comp_lst
-        print new_comp
         year = new_comp
 
     elif crpt_method == "full_month" or "abbr_month":
@@ -1,10 +1,20 @@
 # -----------------------------------------------------------------------------
 # Import necessary modules
 
+import array
+import cPickle
+import json
 import math
+import multiprocessing
+import os
 import random
 
+import aliassampler
 import basefunctions
+import bloomfilter
+import corruptionplan
+import keyedrandom
+import numdupdist
 import positionfunctions
 
 class CorruptDataSet:
@@ -29,7 +39,9 @@ class CorruptDataSet:
 
      num_dup_dist           The probability distribution used to create the
                             duplicate records for one original record (possible
-                            distributions are: 'uniform', 'poisson', 'zipf')
+                            distributions are: 'uniform', 'poisson', 'zipf',
+                            'geometric', 'empirical', and distributions added
+                            with 'numdupdist.register_num_dup_dist')
 
      max_num_mod_per_attr   The maximum number of modifications are to be
                             applied on a single attribute.
@@ -79,6 +91,149 @@ class CorruptDataSet:
      modification will be applied, with 20% likelihood a value will be set to
      a missing value, and with 25% likelihood a keyboard typing error
      modification will be applied.
+
+     The following arguments are optional:
+
+     num_dup_dist_params    A dictionary with the parameters of the
+                            'num_dup_dist' distribution (see module
+                            'numdupdist'), for example {'theta':0.3} for a
+                            'zipf' distribution, {'prob':0.6} for a
+                            'geometric' distribution, or {'file_name':
+                            'dup-histogram.csv'} for an 'empirical'
+                            distribution.
+
+     random_seed            An integer seed. If given, all random values are
+                            drawn from keyed random streams (see module
+                            'keyedrandom') that only depend on this seed and
+                            on the original record identifier, the duplicate
+                            number and the attribute that is modified. Each
+                            duplicate therefore does not depend on any other
+                            original record, and can be regenerated on its own
+                            (see 'regenerate_duplicate'). If not given, the
+                            global random generator is used.
+
+     num_processes          The number of processes used to generate the
+                            duplicate records (default 1). If larger than 1
+                            then 'random_seed' must be given, and the generated
+                            records are the same for any number of processes.
+
+     verbose                A flag, if set to True (default) details about
+                            every modification and generated duplicate are
+                            printed. If set to False nothing is printed.
+
+     event_log_file_name    The name of a file into which each modification of
+                            an accepted duplicate is written as one JSON object
+                            per line (see class 'CorruptionEventLog'). If not
+                            given no event log is written.
+
+     checkpoint_file_name   The name of a checkpoint file. If given,
+                            'corrupt_records' writes the duplicates generated
+                            so far into a journal file (with the same name
+                            plus '.dups') and regularly saves its progress into
+                            the checkpoint file, so an interrupted run can be
+                            resumed. Checkpoints are not written by
+                            'corrupt_records_stream'.
+
+     checkpoint_interval    The number of original records that are processed
+                            between two checkpoints (default 1000).
+
+     resume                 A flag, if set to True and the checkpoint file
+                            exists, 'corrupt_records' continues from the last
+                            checkpoint. The records (and the seed of the random
+                            generator) given need to be the same as in the
+                            interrupted run, and the result is then the same
+                            as that of an uninterrupted run. Default is False.
+
+     engine                 The order in which the values of the duplicates
+                            are modified, either 'record' (default) or
+                            'column'. The 'record' engine selects one attribute
+                            and corruptor at a time for each duplicate, and
+                            corrupts the selected values before the next
+                            selection. The 'column' engine first selects all
+                            attributes and corruptors needed by the duplicates
+                            generated together, and then corrupts the values
+                            column by column, with one batch for each
+                            attribute and corruptor (record level corruptors
+                            come after all attributes). Both engines follow
+                            the same settings, but with the same seed they
+                            generate different duplicates.
+
+     check_can_corrupt      A flag, if set to True (default) attributes and
+                            corruptors are only selected if the corruptor can
+                            modify the current value of the attribute (see the
+                            'can_corrupt' method of corruptors), with the
+                            probabilities of the others normalised. This
+                            avoids tries that leave a value unchanged. If set
+                            to False all attributes and corruptors can be
+                            selected.
+
+     min_success_rate       The success rate below which a corruptor is no
+                            longer selected for an attribute. During a run the
+                            number of attempts of each corruptor on each
+                            attribute and how many of them left the value
+                            unchanged are counted (see 'corruptor_stats').
+                            Once a corruptor has at least
+                            'min_success_attempts' attempts and fewer than
+                            this share of them changed the value, it is
+                            dropped for the attribute (unless it is the last
+                            corruptor of the attribute that is not dropped).
+                            Default is None, where no corruptor is dropped.
+                            As dropping depends on the records processed
+                            before, the duplicates then depend on the order of
+                            the records and on the number of processes (each
+                            worker process drops corruptors on its own).
+
+     min_success_attempts   The number of attempts of a corruptor on an
+                            attribute before it can be dropped (default 100).
+
+     max_dup_tries          The maximum number of tries to generate a
+                            duplicate that is different from the original
+                            record and its other duplicates (default 100). If
+                            no such duplicate is found, no more duplicates are
+                            generated for the original record, and the
+                            shortfall is reported (see 'shortfall_list')
+                            rather than trying forever. 'analyse_variants'
+                            can be used to find such records before a run.
+
+     unique_records         A flag, if set to True every duplicate has to be
+                            different from all original records and all other
+                            duplicates generated, not only from its own
+                            original record and the duplicates of this record
+                            (default False). A duplicate that is the same as
+                            another record is generated again (up to
+                            'max_dup_tries' tries). The records are kept in a
+                            Bloom filter (see module 'bloomfilter') of fixed
+                            size, so few duplicates are also generated again
+                            because of a false positive. In
+                            'corrupt_records_stream' a duplicate is only
+                            checked against the original records read so far.
+                            As a duplicate then depends on the records
+                            processed before, only one process can be used,
+                            and duplicates are reproduced with 'apply_plan'
+                            rather than 'regenerate_duplicate'.
+
+     unique_error_rate      The likelihood of a false positive of the Bloom
+                            filter once all original records and duplicates
+                            are added (default 0.001).
+
+     num_shards             The number of shards a data set is split into, so
+                            its duplicates can be generated on several
+                            machines (default 1). Each shard generates the
+                            duplicates of a range of the original records
+                            (see 'shard_range') in the order of the whole data
+                            set. The number of duplicates of every original
+                            record is assigned for the whole data set, so all
+                            shards together generate 'number_of_mod_records'
+                            duplicates, and the same duplicates (and plans and
+                            events, in the order of the shards) as a single
+                            run with 'num_shards' 1 given the same record
+                            order. If larger than 1 then 'random_seed' must be
+                            given, and 'unique_records' and
+                            'min_success_rate' (which make duplicates depend
+                            on the records processed before) cannot be used.
+
+     shard_index            The number of the shard generated by this data set
+                            corruptor, from 0 to 'num_shards'-1 (default 0).
   """
 
   # ---------------------------------------------------------------------------
@@ -92,10 +247,45 @@ class CorruptDataSet:
     self.attribute_name_list =   None
     self.max_num_dup_per_rec =   None
     self.num_dup_dist =          None
+    self.num_dup_dist_params =   {}
     self.num_mod_per_rec =       None
     self.max_num_mod_per_attr =  None
     self.attr_mod_prob_dict =    None
     self.attr_mod_data_dict =    None
+    self.random_seed =           None
+    self.num_processes =         1
+    self.verbose =               True
+    self.event_log_file_name =   None
+    self.checkpoint_file_name =  None
+    self.checkpoint_interval =   1000
+    self.resume =                False
+    self.engine =                'record'
+    self.check_can_corrupt =     True
+    self.min_success_rate =      None
+    self.min_success_attempts =  100
+    self.max_dup_tries =         100
+    self.unique_records =        False
+    self.unique_error_rate =     0.001
+    self.num_shards =            1
+    self.shard_index =           0
+
+    self.event_log =  None  # The event log while records are corrupted
+    self.event_list = []    # Events not yet written into the event log
+
+    self.corruption_plan = None  # Plan of the last run of 'corrupt_records'
+    self.plan_dup_list =   []    # Duplicates not yet added to the plan
+
+    # Original records of the last run for which fewer duplicates than
+    # assigned were generated, as tuples (original record identifier, number
+    # of duplicates assigned, number of duplicates generated)
+    #
+    self.shortfall_list = []
+
+    self.unique_filter =         None  # Records generated in the current run
+    self.num_unique_collisions = 0     # Duplicates the same as another record
+
+    self.journal_file =         None  # Journal of duplicates generated so far
+    self.last_checkpoint_i =    0     # Number of records at last checkpoint
 
     # Process the keyword arguments
     #
@@ -120,8 +310,12 @@ class CorruptDataSet:
         basefunctions.check_is_positive('max_num_dup_per_rec', value)
         self.max_num_dup_per_rec = value
 
+      elif (keyword.startswith('num_dup_dist_p')):
+        basefunctions.check_is_dictionary('num_dup_dist_params', value)
+        self.num_dup_dist_params = value
+
       elif (keyword.startswith('num_dup_')):
-        if (value not in ['uniform', 'poisson', 'zipf']):
+        if (value not in numdupdist.num_dup_dist_dict):
           raise Exception, 'Illegal value given for "num_dup_dist": %s' % \
                            (str(value))
         self.num_dup_dist = value
@@ -144,6 +338,79 @@ class CorruptDataSet:
         basefunctions.check_is_dictionary('attr_mod_data_dict', value)
         self.attr_mod_data_dict = value
 
+      elif (keyword.startswith('random_s')):
+        basefunctions.check_is_integer('random_seed', value)
+        self.random_seed = value
+
+      elif (keyword.startswith('num_proc')):
+        basefunctions.check_is_integer('num_processes', value)
+        basefunctions.check_is_positive('num_processes', value)
+        self.num_processes = value
+
+      elif (keyword.startswith('verb')):
+        basefunctions.check_is_flag('verbose', value)
+        self.verbose = value
+
+      elif (keyword.startswith('event_log')):
+        basefunctions.check_is_non_empty_string('event_log_file_name', value)
+        self.event_log_file_name = value
+
+      elif (keyword.startswith('checkpoint_f')):
+        basefunctions.check_is_non_empty_string('checkpoint_file_name', value)
+        self.checkpoint_file_name = value
+
+      elif (keyword.startswith('checkpoint_i')):
+        basefunctions.check_is_integer('checkpoint_interval', value)
+        basefunctions.check_is_positive('checkpoint_interval', value)
+        self.checkpoint_interval = value
+
+      elif (keyword.startswith('resume')):
+        basefunctions.check_is_flag('resume', value)
+        self.resume = value
+
+      elif (keyword.startswith('engine')):
+        if (value not in ['record', 'column']):
+          raise Exception, 'Illegal value given for "engine": %s' % \
+                           (str(value))
+        self.engine = value
+
+      elif (keyword.startswith('check_can')):
+        basefunctions.check_is_flag('check_can_corrupt', value)
+        self.check_can_corrupt = value
+
+      elif (keyword.startswith('min_success_r')):
+        basefunctions.check_is_normalised('min_success_rate', value)
+        self.min_success_rate = value
+
+      elif (keyword.startswith('min_success_a')):
+        basefunctions.check_is_integer('min_success_attempts', value)
+        basefunctions.check_is_positive('min_success_attempts', value)
+        self.min_success_attempts = value
+
+      elif (keyword.startswith('max_dup_t')):
+        basefunctions.check_is_integer('max_dup_tries', value)
+        basefunctions.check_is_positive('max_dup_tries', value)
+        self.max_dup_tries = value
+
+      elif (keyword.startswith('unique_r')):
+        basefunctions.check_is_flag('unique_records', value)
+        self.unique_records = value
+
+      elif (keyword.startswith('unique_e')):
+        basefunctions.check_is_normalised('unique_error_rate', value)
+        basefunctions.check_is_positive('unique_error_rate', value)
+        self.unique_error_rate = value
+
+      elif (keyword.startswith('num_sh')):
+        basefunctions.check_is_integer('num_shards', value)
+        basefunctions.check_is_positive('num_shards', value)
+        self.num_shards = value
+
+      elif (keyword.startswith('shard_i')):
+        basefunctions.check_is_integer('shard_index', value)
+        basefunctions.check_is_not_negative('shard_index', value)
+        self.shard_index = value
+
       else:
         raise Exception, 'Illegal constructor argument keyword: "%s"' % \
               (str(keyword))
@@ -180,6 +447,22 @@ class CorruptDataSet:
                                 self.attr_mod_prob_dict)
     basefunctions.check_is_dictionary('attr_mod_data_dict',
                                       self.attr_mod_data_dict)
+    if ((self.num_processes > 1) and (self.random_seed == None)):
+      raise Exception, 'A "random_seed" must be given when more than one ' + \
+                       'process is used'
+    if ((self.num_processes > 1) and (self.unique_records == True)):
+      raise Exception, 'Only one process can be used if "unique_records" ' + \
+                       'is set to True'
+    if (self.shard_index >= self.num_shards):
+      raise Exception, 'Value of "shard_index" must be smaller than ' + \
+                       '"num_shards": %d' % (self.shard_index)
+    if (self.num_shards > 1):
+      if (self.random_seed == None):
+        raise Exception, 'A "random_seed" must be given when the data set ' + \
+                         'is split into shards'
+      if ((self.unique_records == True) or (self.min_success_rate != None)):
+        raise Exception, '"unique_records" and "min_success_rate" cannot ' + \
+                         'be used when the data set is split into shards'
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     # Check if it is possible to generate the desired number of modified
@@ -200,71 +483,32 @@ class CorruptDataSet:
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     # Create a distribution for the number of duplicates for an original record
     #
-    num_dup =  1
-    prob_sum = 0.0
-    self.prob_dist_list = [(num_dup, prob_sum)]
-
-    if (self.num_dup_dist == 'uniform'):
-      uniform_val = 1.0 / float(self.max_num_dup_per_rec)
-
-      for i in range(self.max_num_dup_per_rec-1):
-        num_dup += 1
-        self.prob_dist_list.append((num_dup,
-                                    uniform_val+self.prob_dist_list[-1][1]))
-
-    elif (self.num_dup_dist == 'poisson'):
-
-      def fac(n):  # Factorial of an integer number (recursive calculation)
-        if (n > 1.0):
-          return n*fac(n - 1.0)
-        else:
-          return 1.0
-
-      poisson_num = []   # A list of poisson numbers
-      poisson_sum = 0.0  # The sum of all poisson number
-
-      # The mean (lambda) for the poisson numbers
-      #
-      mean = 1.0 + (float(self.number_of_mod_records) / \
-                    float(self.number_of_org_records))
-
-      for i in range(self.max_num_dup_per_rec):
-        poisson_num.append((math.exp(-mean) * (mean ** i)) / fac(i))
-        poisson_sum += poisson_num[-1]
+    num_dup_rate = float(self.number_of_mod_records) / \
+                   float(self.number_of_org_records)
 
-      for i in range(self.max_num_dup_per_rec):  # Scale so they sum up to 1.0
-        poisson_num[i] = poisson_num[i] / poisson_sum
+    self.num_dup_prob_list = \
+                 numdupdist.num_dup_prob_list(self.num_dup_dist,
+                                              self.max_num_dup_per_rec,
+                                              num_dup_rate,
+                                              self.num_dup_dist_params)
 
-      for i in range(self.max_num_dup_per_rec-1):
-        num_dup += 1
-        self.prob_dist_list.append((num_dup,
-                                    poisson_num[i]+self.prob_dist_list[-1][1]))
-
-    elif (self.num_dup_dist == 'zipf'):
-      zipf_theta = 0.5
-
-      denom = 0.0
-      for i in range(self.number_of_org_records):
-        denom += (1.0 / (i+1) ** (1.0 - zipf_theta))
-
-      zipf_c = 1.0 / denom
-      zipf_num = []  # A list of Zipf numbers
-      zipf_sum = 0.0  # The sum of all Zipf number
-
-      for i in range(self.max_num_dup_per_rec):
-        zipf_num.append(zipf_c / ((i+1) ** (1.0 - zipf_theta)))
-        zipf_sum += zipf_num[-1]
-
-      for i in range(self.max_num_dup_per_rec):  # Scale so they sum up to 1.0
-        zipf_num[i] = zipf_num[i] / zipf_sum
+    # The summed probabilities of fewer duplicates for each number of
+    # duplicates
+    #
+    self.prob_dist_list = []
+    prob_sum = 0.0
+    for (num_dups, num_dup_prob) in self.num_dup_prob_list:
+      self.prob_dist_list.append((num_dups, prob_sum))
+      prob_sum += num_dup_prob
 
-      for i in range(self.max_num_dup_per_rec-1):
-        num_dup += 1
-        self.prob_dist_list.append((num_dup,
-                                    zipf_num[i]+self.prob_dist_list[-1][1]))
+    if (self.verbose == True):
+      print 'Probability distribution for number of duplicates per record:'
+      print self.prob_dist_list
 
-    print 'Probability distribution for number of duplicates per record:'
-    print self.prob_dist_list
+    num_dup_sampler_list = []
+    for (num_dups, num_dup_prob) in self.num_dup_prob_list:
+      num_dup_sampler_list.append((num_dup_prob, num_dups))
+    self.num_dup_sampler = aliassampler.AliasSampler(num_dup_sampler_list)
 
     # Check probability list for attributes and dictionary for attributes - - -
     # if they sum to 1.0
@@ -301,286 +545,2538 @@ class CorruptDataSet:
         raise Exception, 'Probability sum is no 1.0 for attribute "%s"' % \
                          (attr_name)
 
-    # Generate a list with attribute probabilities summed for easy selection
+    # Generate alias samplers for the selection of attributes and corruptors.
+    # The attribute sampler returns the attribute name, its index in the
+    # records, and the sampler for the corruptors of this attribute, which
+    # returns the index of the corruptor in the list of the attribute and the
+    # corruptor. Attributes and corruptors with probability 0.0 are never
+    # selected and dropped.
     #
-    self.attr_mod_prob_list = []
-    prob_sum = 0
+    attr_sampler_list =      []
+    self.mod_attr_list =     []  # Pairs (attribute name, index) of sampler
+    self.num_crpt_dict =     {}  # Number of corruptors that can be selected
+    self.crpt_sampler_dict = {}  # Corruptor sampler of each attribute
+
     for (attr_name, attr_prob) in self.attr_mod_prob_dict.items():
-      prob_sum += attr_prob
-      self.attr_mod_prob_list.append([prob_sum, attr_name])
-    #print self.attr_mod_prob_list
+      if (attr_prob > 0.0):
+        if (attr_name not in self.attr_mod_data_dict):
+          raise Exception, 'No corruptors given in "attr_mod_data_dict" ' + \
+                           'for attribute "%s"' % (attr_name)
+        corruptor_sampler_list = []
+        for (crpt_index, (crpt_prob, corruptor)) in \
+            enumerate(self.attr_mod_data_dict[attr_name]):
+          corruptor_sampler_list.append((crpt_prob, (crpt_index, corruptor)))
+        corruptor_sampler = \
+               aliassampler.AliasSampler(corruptor_sampler_list)
+        self.num_crpt_dict[attr_name] = \
+                len([1 for (crpt_prob, crpt) in corruptor_sampler_list
+                     if (crpt_prob > 0.0)])
+        self.crpt_sampler_dict[attr_name] = corruptor_sampler
+        attr_index = self.attribute_name_list.index(attr_name)
+        attr_sampler_list.append((attr_prob, (attr_name, attr_index,
+                                              corruptor_sampler)))
+        self.mod_attr_list.append((attr_name, attr_index))
+    self.attr_sampler = aliassampler.AliasSampler(attr_sampler_list)
+
+    # The number of modifications of each attribute in a try to generate a
+    # duplicate is counted in a list with one counter for each attribute in
+    # 'attribute_name_list', which is copied from this list of zeros
+    #
+    self.zero_mod_count_list = [0] * len(self.attribute_name_list)
+
+    self.__reset_corruptor_stats__()
 
   # ---------------------------------------------------------------------------
 
-  def corrupt_records(self, rec_dict):
+  def corrupt_records(self, rec_dict, org_rec_id_list=None):
     """Method to corrupt modify the records in the given record dictionary
        according to the settings of the data set corruptor.
+
+       The order of the original records, which determines how many
+       duplicates each record gets, can be given as a list of their
+       identifiers (default is the order of the keys of the dictionary). If
+       the data set is split into shards, the dictionary only contains the
+       original records of this shard (see 'shard_range'), and the list of
+       their identifiers in the order of the whole data set (such as the order
+       of the records in its file) has to be given.
+
+       The decisions made to generate the duplicates are kept in a plan
+       (see 'corruptionplan.CorruptionPlan') in 'corruption_plan'. Original
+       records for which not all duplicates could be generated are listed in
+       'shortfall_list'.
     """
 
     # Check if number of records given is what is expected
     #
-    assert self.number_of_org_records == len(rec_dict), \
+    (shard_start_i, shard_end_i) = self.shard_range()
+
+    assert shard_end_i - shard_start_i == len(rec_dict), \
            'Illegal number of records to modify given'
 
+    if (org_rec_id_list == None):
+      if (self.num_shards > 1):
+        raise Exception, 'The identifiers of the original records of a ' + \
+                         'shard have to be given in "org_rec_id_list"'
+      org_rec_id_list = rec_dict.keys()
+    else:
+      basefunctions.check_is_list('org_rec_id_list', org_rec_id_list)
+      if (len(org_rec_id_list) != len(rec_dict)):
+        raise Exception, 'Illegal number of record identifiers given in ' + \
+                         '"org_rec_id_list": %d' % (len(org_rec_id_list))
+
+    rng = self.__stream__('num-dups')  # Random stream to assign duplicates
+
+    # Get the progress of an interrupted run if it is to be resumed
+    #
+    checkpoint_dict = self.__read_checkpoint__()
+
+    self.__reset_corruptor_stats__(checkpoint_dict)
+
     # First generate for each original record the number of duplicates that are
-    # to be generated for it.
+    # to be generated for it (for all records of the data set, of which a
+    # shard only keeps those of its records).
+    #
+    if (checkpoint_dict == None):
+      dup_rec_num_array = self.__assign_num_dups__(rng)
+      if (self.num_shards > 1):
+        dup_rec_num_array = dup_rec_num_array[shard_start_i:shard_end_i]
+    else:
+      dup_rec_num_array = checkpoint_dict['dup_rec_num_array']
+
+    # Generate a histogram of number of duplicates per record
+    #
+    if (self.verbose == True):
+      dup_histo = {}
+      for num_dups in dup_rec_num_array:
+        if (num_dups > 0):
+          dup_count = dup_histo.get(num_dups, 0) + 1
+          dup_histo[num_dups] = dup_count
+      print 'Distribution of number of original records with certain ' + \
+            'number of duplicates:'
+      dup_histo_keys = dup_histo.keys()
+      dup_histo_keys.sort()
+      for num_dups in dup_histo_keys:
+        print ' Number of records with %d duplicates: %d' % \
+              (num_dups, dup_histo[num_dups])
+      print
+
+    self.num_dup_rec_created = 0  # Count how many duplicate records have
+                                  # been generated
+
+    # Main loop over all original records for which to generate duplicates - -
+    #
+    org_rec_dup_list = []
+    for org_rec_i in xrange(len(org_rec_id_list)):
+      if (dup_rec_num_array[org_rec_i] > 0):
+        org_rec_dup_list.append((org_rec_id_list[org_rec_i],
+                                 dup_rec_num_array[org_rec_i]))
+
+    new_dup_rec_list = []
+    org_rec_i =        0  # Number of records in 'org_rec_dup_list' processed
+
+    self.corruption_plan = self.__new_plan__()
+
+    self.__new_unique_filter__()
+    if (self.unique_filter != None):
+      for rec_list in rec_dict.itervalues():
+        self.unique_filter.add(repr(list(rec_list)))
+
+    self.__open_event_log__(checkpoint_dict)
+    try:
+      if (self.checkpoint_file_name != None):
+        (org_rec_i, new_dup_rec_list, plan_dup_list) = \
+                                        self.__open_journal__(checkpoint_dict)
+        self.num_dup_rec_created = len(new_dup_rec_list)
+        for plan_dup in plan_dup_list:
+          self.corruption_plan.add_duplicate(*plan_dup)
+
+        # The duplicates before the checkpoint have to be unique as well
+        #
+        if (self.unique_filter != None):
+          for (dup_rec_id, dup_rec_list) in new_dup_rec_list:
+            self.unique_filter.add(repr(list(dup_rec_list)))
+
+      for (chunk_num_org_rec, chunk_dup_rec_list, chunk_event_list,
+           chunk_plan_dup_list) in \
+          self.__corrupt_record_chunks__(rec_dict,
+                                         org_rec_dup_list[org_rec_i:]):
+        new_dup_rec_list += chunk_dup_rec_list
+        self.num_dup_rec_created = len(new_dup_rec_list)
+        self.event_list += chunk_event_list
+        self.__write_events__()
+
+        for plan_dup in chunk_plan_dup_list:
+          self.corruption_plan.add_duplicate(*plan_dup)
+
+        org_rec_i += chunk_num_org_rec
+
+        if (self.checkpoint_file_name != None):
+          self.__write_checkpoint__(org_rec_i, len(org_rec_dup_list),
+                                    dup_rec_num_array, chunk_dup_rec_list,
+                                    chunk_plan_dup_list)
+    finally:
+      self.__close_journal__()
+      self.__close_event_log__()
+      self.unique_filter = None
+
+    for (dup_rec_id, dup_rec_list) in new_dup_rec_list:
+      rec_dict[dup_rec_id] = dup_rec_list
+
+    # Find the original records with fewer duplicates than assigned (from the
+    # plan, as it also contains the duplicates before a checkpoint)
     #
-    dup_rec_num_dict = {}  # Keys are the record identifiers of the original
-                           # records, value their number of duplicates
-    total_num_dups = 0     # Total number of duplicates generated
+    self.shortfall_list = []
+
+    org_dup_range_dict = self.corruption_plan.org_dup_range_dict()
 
-    org_rec_id_list = rec_dict.keys()
-    random.shuffle(org_rec_id_list)
+    for (org_rec_id, num_dups) in org_rec_dup_list:
+      if (org_rec_id in org_dup_range_dict):
+        (org_i, start_i, end_i) = org_dup_range_dict[org_rec_id]
+        num_dups_created = end_i - start_i
+      else:
+        num_dups_created = 0
 
-    org_rec_i = 0  # Loop counter over which record to assign duplicates to
+      if (num_dups_created < num_dups):
+        self.shortfall_list.append((org_rec_id, num_dups, num_dups_created))
 
-    while ((org_rec_i < self.number_of_org_records) and \
-           (total_num_dups < self.number_of_mod_records)):
+    if (self.verbose == True):
+      self.__print_corruptor_stats__()
+      self.__print_shortfalls__()
+      self.__print_unique_collisions__()
 
-      # Randomly choose how many duplicates to create for this original record
-      #
-      r = random.random()  # Random number between 0.0 and 1.0
-      ind = -1
-      while (self.prob_dist_list[ind][1] > r):
-        ind -= 1
-      num_dups = self.prob_dist_list[ind][0]
+    return rec_dict
+
+  # ---------------------------------------------------------------------------
+
+  def shard_range(self):
+    """Method which returns the range of the original records of the shard
+       of this data set corruptor, as a pair (index of the first record,
+       index after the last record) in the order of the whole data set. The
+       records are split into 'num_shards' ranges of (almost) the same size.
+    """
+
+    num_org_rec = self.number_of_org_records
+
+    return (self.shard_index * num_org_rec / self.num_shards,
+            (self.shard_index+1) * num_org_rec / self.num_shards)
+
+  # ---------------------------------------------------------------------------
+
+  def __corrupt_record_chunk__(self, rec_dict, org_rec_dup_list):
+    """Helper method which generates the duplicates for the given list of
+       pairs (original record identifier, number of duplicates), and returns
+       a list of pairs (duplicate record identifier, duplicate record list).
+    """
+
+    org_rec_list = []
 
+    for (org_rec_id_to_mod, num_dups) in org_rec_dup_list:
       assert (num_dups > 0) and (num_dups <= self.max_num_dup_per_rec)
 
-      # Check if there are still 'enough' duplicates to generate
-      #
-      if (num_dups <= (self.number_of_mod_records-total_num_dups)):
+      org_rec_list.append((org_rec_id_to_mod, rec_dict[org_rec_id_to_mod],
+                           num_dups))
+
+    return self.__create_duplicates__(org_rec_list)
+
+  # ---------------------------------------------------------------------------
+
+  def __corrupt_record_chunks__(self, rec_dict, org_rec_dup_list):
+    """Helper generator which generates the duplicates for the given list of
+       pairs (original record identifier, number of duplicates) in chunks, one
+       after the other, either in this process or with a pool of worker
+       processes.
+
+       For each chunk a tuple (number of original records in the chunk, list
+       of duplicates, list of events, list of duplicates for the plan) is
+       yielded.
+    """
+
+    if (self.num_processes > 1):
+      for chunk_tuple in self.__corrupt_records_parallel__(rec_dict,
+                                                           org_rec_dup_list):
+        yield chunk_tuple
+
+    else:
+      chunk_size = self.checkpoint_interval
+
+      for i in xrange(0, len(org_rec_dup_list), chunk_size):
+        chunk_list = org_rec_dup_list[i:i+chunk_size]
+
+        chunk_dup_rec_list = self.__corrupt_record_chunk__(rec_dict,
+                                                           chunk_list)
+        chunk_event_list =    self.event_list
+        chunk_plan_dup_list = self.plan_dup_list
+        self.event_list =     []
+        self.plan_dup_list =  []
+
+        yield (len(chunk_list), chunk_dup_rec_list, chunk_event_list,
+               chunk_plan_dup_list)
+
+  # ---------------------------------------------------------------------------
+
+  def __corrupt_records_parallel__(self, rec_dict, org_rec_dup_list):
+    """Helper generator which splits the given list of pairs (original record
+       identifier, number of duplicates) into chunks that are processed by a
+       pool of 'num_processes' worker processes.
+
+       The worker processes are forked after the data set corruptor and the
+       record dictionary have been made available as module variables, so the
+       corruptor objects (including their look-up tables) are shared with the
+       workers rather than being pickled or rebuilt in each worker.
+
+       The chunks are yielded in the same order as if they had been generated
+       by a single process, as tuples (number of original records in the
+       chunk, list of duplicates, list of events, list of duplicates for the
+       plan).
+    """
+
+    global worker_data_set, worker_rec_dict
+
+    num_chunks = self.num_processes * 4
+    chunk_size = max(1, (len(org_rec_dup_list)+num_chunks-1) / num_chunks)
+    if (self.checkpoint_file_name != None):
+      chunk_size = min(chunk_size, self.checkpoint_interval)
+
+    chunk_list = []
+    for i in range(0, len(org_rec_dup_list), chunk_size):
+      chunk_list.append(org_rec_dup_list[i:i+chunk_size])
+
+    worker_data_set = self
+    worker_rec_dict = rec_dict
 
-        # Select next record for which to generate duplicates
+    pool = multiprocessing.Pool(self.num_processes)
+    try:
+      chunk_i = 0
+      for (chunk_dup_rec_list, chunk_event_list, chunk_plan_dup_list,
+           start_stats_dict, end_stats_dict) in \
+          pool.imap(corrupt_record_chunk_worker, chunk_list):
+
+        # Add the attempts of the corruptors in this chunk
         #
-        org_rec_id = org_rec_id_list[org_rec_i]
-        org_rec_i += 1
-        dup_rec_num_dict[org_rec_id] = num_dups
-        total_num_dups += num_dups
+        self.__add_corruptor_stats__(end_stats_dict, start_stats_dict)
+
+        yield (len(chunk_list[chunk_i]), chunk_dup_rec_list, chunk_event_list,
+               chunk_plan_dup_list)
+        chunk_i += 1
+      pool.close()
+    except:
+      pool.terminate()
+      raise
+    finally:
+      pool.join()
+      worker_data_set = None
+      worker_rec_dict = None
+
+  # ---------------------------------------------------------------------------
+
+  def corrupt_records_stream(self, rec_iter):
+    """Method to corrupt modify the records given by an iterator in a single
+       pass, without holding the whole data set in memory.
+
+       The iterator needs to provide pairs (record identifier, record list) for
+       exactly 'number_of_org_records' original records. This method is a
+       generator which yields each original record (again as a pair) followed
+       by the duplicates generated for it, so only one original record and its
+       duplicates are kept in memory at any time.
+
+       For each original record it is decided when it is read how many
+       duplicates will be generated for it, such that in total exactly
+       'number_of_mod_records' duplicates are generated, and no original
+       record gets more than 'max_num_dup_per_rec' duplicates. The number of
+       duplicates for a selected record is drawn from 'num_dup_dist'.
+    """
+
+    if (self.num_shards > 1):
+      raise Exception, 'Records cannot be corrupted as a stream when the ' + \
+                       'data set is split into shards'
+
+    # The expected number of duplicates for a record selected for duplication
+    #
+    mean_num_dups = 0.0
+    for (num_dups, num_dup_prob) in self.num_dup_prob_list:
+      mean_num_dups += num_dups * num_dup_prob
+
+    rng = self.__stream__('num-dups')  # Random stream to assign duplicates
+
+    self.num_dup_rec_created = 0
+    self.shortfall_list =      []
+
+    self.__reset_corruptor_stats__()
+    self.__new_unique_filter__()
+
+    self.__open_event_log__()
+    try:
+      for rec in self.__corrupt_records_stream__(rec_iter, rng,
+                                                 mean_num_dups):
+        yield rec
+    finally:
+      self.__close_event_log__()
+      self.unique_filter = None
+
+    if (self.verbose == True):
+      self.__print_corruptor_stats__()
+      self.__print_shortfalls__()
+      self.__print_unique_collisions__()
+
+  # ---------------------------------------------------------------------------
+
+  def __corrupt_records_stream__(self, rec_iter, rng, mean_num_dups):
+    """Helper generator for 'corrupt_records_stream' which reads the original
+       records and yields them together with their duplicates.
+    """
+
+    num_org_rec_left = self.number_of_org_records  # Records not yet read
+    num_dups_left =    self.number_of_mod_records  # Duplicates still needed
+
+    for (org_rec_id, rec_to_mod_list) in rec_iter:
+
+      if (num_org_rec_left == 0):
+        raise Exception, 'More than %d original records given' % \
+                         (self.number_of_org_records)
+
+      yield (org_rec_id, rec_to_mod_list)
+
+      if (self.unique_filter != None):
+        self.unique_filter.add(repr(list(rec_to_mod_list)))
+
+      # Minimum number of duplicates for this record so that enough
+      # duplicates can still be generated for the records not yet read
+      #
+      min_num_dups = num_dups_left - (num_org_rec_left - 1) * \
+                                     self.max_num_dup_per_rec
+      num_org_rec_left -= 1
+
+      if (num_dups_left == 0):
+        continue
+
+      # Select this record with a likelihood such that the expected number of
+      # duplicates over the remaining records corresponds to what is needed
+      #
+      select_prob = num_dups_left / (mean_num_dups * (num_org_rec_left+1))
+
+      if ((min_num_dups > 0) or (rng.random() < select_prob)):
+        num_dups = self.__draw_num_dups__(rng)
+        num_dups = min(max(num_dups, min_num_dups), num_dups_left)
+
+        dup_rec_list = self.__create_duplicates__([(org_rec_id,
+                                                    rec_to_mod_list,
+                                                    num_dups)])
+        for dup_rec in dup_rec_list:
+          yield dup_rec
+        self.__write_events__()
+        self.plan_dup_list = []  # No plan is kept for streamed records
+
+        if (len(dup_rec_list) < num_dups):
+          self.shortfall_list.append((org_rec_id, num_dups,
+                                      len(dup_rec_list)))
+
+        num_dups_left -= num_dups
+
+    if (num_org_rec_left > 0):
+      raise Exception, 'Only %d of %d original records given' % \
+                       (self.number_of_org_records-num_org_rec_left,
+                        self.number_of_org_records)
+    num_dups_short = 0
+    for (org_rec_id, num_dups, num_dups_created) in self.shortfall_list:
+      num_dups_short += num_dups - num_dups_created
+    assert self.num_dup_rec_created + num_dups_short == \
+           self.number_of_mod_records
+
+  # ---------------------------------------------------------------------------
+
+  def __assign_num_dups__(self, rng):
+    """Helper method which assigns to each original record the number of
+       duplicates to be generated for it, using the given random stream.
+
+       Returns an integer array with one number of duplicates (possibly 0) for
+       each original record, in the order of the record identifiers in the
+       record dictionary.
+
+       Original records are selected in random order (a partial shuffle of
+       their positions) and given a number of duplicates drawn from
+       'num_dup_dist', until 'number_of_mod_records' duplicates are assigned.
+       The number of the last selected record is reduced so the total is
+       exact. If all records are selected and the total is still too small,
+       the number of duplicates of records is increased by one in rounds over
+       the records in their selection order, until the total is reached.
+    """
+
+    num_org_rec = self.number_of_org_records
 
-    assert total_num_dups == sum(dup_rec_num_dict.values())
+    dup_rec_num_array = array.array('i', [0]) * num_org_rec
+    rec_pos_array =     array.array('i', xrange(num_org_rec))
+
+    num_dups_left = self.number_of_mod_records
+    num_sel_rec =   0  # Number of selected records
+
+    while ((num_sel_rec < num_org_rec) and (num_dups_left > 0)):
+
+      # Select the next record as one of the records not selected yet
+      #
+      j = num_sel_rec + int(rng.random() * (num_org_rec - num_sel_rec))
+      org_rec_pos = rec_pos_array[j]
+      rec_pos_array[j] = rec_pos_array[num_sel_rec]
+      rec_pos_array[num_sel_rec] = org_rec_pos
+      num_sel_rec += 1
+
+      num_dups = min(self.__draw_num_dups__(rng), num_dups_left)
+
+      dup_rec_num_array[org_rec_pos] = num_dups
+      num_dups_left -= num_dups
 
     # Deal with the case where every original record has a number of duplicates
     # but not enough duplicates are generated in total
     #
-    org_rec_id_list = rec_dict.keys()
-    random.shuffle(org_rec_id_list)
+    while (num_dups_left > 0):
+      for sel_i in xrange(num_sel_rec):
+        org_rec_pos = rec_pos_array[sel_i]
+
+        if (dup_rec_num_array[org_rec_pos] < self.max_num_dup_per_rec):
+          dup_rec_num_array[org_rec_pos] += 1
+          num_dups_left -= 1
+
+          if (num_dups_left == 0):
+            break
+
+    assert sum(dup_rec_num_array) == self.number_of_mod_records
+
+    return dup_rec_num_array
+
+  # ---------------------------------------------------------------------------
+
+  def __draw_num_dups__(self, rng):
+    """Helper method which randomly selects the number of duplicates to be
+       generated for one original record, using the given random stream.
+    """
+
+    num_dups = self.num_dup_sampler.sample(rng)
+
+    assert (num_dups > 0) and (num_dups <= self.max_num_dup_per_rec)
 
-    while (total_num_dups < self.number_of_mod_records):
-      org_rec_id = random.choice(org_rec_id_list)
+    return num_dups
 
-      # If possible, increase number of duplicates for this record by 1
+  # ---------------------------------------------------------------------------
+
+  def __create_duplicates__(self, org_rec_list):
+    """Helper method which generates the duplicates for a list of original
+       records, given as tuples (original record identifier, original record
+       list, number of duplicates), and returns them as a list of pairs
+       (duplicate record identifier, duplicate record list), ordered by
+       original record and duplicate number.
+
+       The duplicates of all given original records are generated together,
+       one modification at a time, so that all values to be modified by the
+       same corruptor are passed to its 'corrupt_values' method in one batch.
+       Each try to generate a duplicate uses its own random streams (if a seed
+       is given), so the duplicates are the same as if they were generated one
+       after the other (and the same for any number of original records given
+       together).
+    """
+
+    org_state_list =  []  # The state of each original record
+    active_try_list = []  # Tries to generate a duplicate not done yet
+
+    for (org_rec_id_to_mod, rec_to_mod_list, num_dups) in org_rec_list:
+
+      # The set of the original record and all its duplicates generated so
+      # far, each as the set of its values that are different from the
+      # original (see '__dup_fingerprint__'), to check new duplicates are
+      # different
       #
-      if (dup_rec_num_dict[org_rec_id] < self.max_num_dup_per_rec):
-        dup_rec_num_dict[org_rec_id] = dup_rec_num_dict[org_rec_id]+1
-        total_num_dups += 1
+      org_state = {'org_rec_id':        org_rec_id_to_mod,
+                   'rec_list':          rec_to_mod_list,
+                   'digest':            corruptionplan.record_digest( \
+                                                          rec_to_mod_list),
+                   'dup_rec_id_prefix': self.__dup_rec_id_prefix__( \
+                                                        org_rec_id_to_mod),
+                   'num_dups_assigned': num_dups,
+                   'num_dups':          num_dups,  # Less if not all found
+                   'next_d':            0,   # Next duplicate to be checked
+                   'fingerprint_set':   set([frozenset()]),
+                   'try_dict':          {},  # The current try of duplicates
+                   'dup_list':          [],  # Identifiers and records
+                   'print_list':        []}  # Lines printed in verbose mode
+      org_state_list.append(org_state)
+
+      # The first try of every duplicate is needed, so they are all started
+      # now, while later tries depend on the duplicates before
+      #
+      for d in xrange(num_dups):
+        dup_try_dict = self.__start_dup_try__(org_state, d, 0)
+        org_state['try_dict'][d] = dup_try_dict
+        active_try_list.append(dup_try_dict)
+
+    while (active_try_list != []):
+      if (self.engine == 'column'):
+        self.__modify_dup_tries_by_column__(active_try_list)
+      else:
+        self.__modify_dup_tries__(active_try_list)
 
-    assert sum(dup_rec_num_dict.values()) == self.number_of_mod_records
+      active_try_list = []
+      for org_state in org_state_list:
+        active_try_list += self.__check_dup_tries__(org_state)
 
-    # Generate a histogram of number of duplicates per record
+    # Collect the duplicates and events in the order of the original records
     #
-    dup_histo = {}
-    for (org_rec_id_to_mod, num_dups) in dup_rec_num_dict.iteritems():
-      dup_count = dup_histo.get(num_dups, 0) + 1
-      dup_histo[num_dups] = dup_count
-    print 'Distribution of number of original records with certain number ' + \
-          'of duplicates:'
-    dup_histo_keys = dup_histo.keys()
-    dup_histo_keys.sort()
-    for num_dups in dup_histo_keys:
-      print ' Number of records with %d duplicates: %d' % \
-            (num_dups, dup_histo[num_dups])
-    print
+    new_dup_rec_list = []
 
-    num_dup_rec_created = 0  # Count how many duplicate records have been
-                             # generated
+    for org_state in org_state_list:
+      new_dup_rec_list += org_state['dup_list']
 
-    # Main loop over all original records for which to generate duplicates - -
+      if (self.verbose == True):
+        print
+        print 'Generating %d modified (duplicate) records for record "%s"' % \
+              (org_state['num_dups_assigned'], org_state['org_rec_id'])
+
+        for print_line in org_state['print_list']:
+          if (print_line == None):  # Placeholder for the count of duplicates
+            self.num_dup_rec_created += 1
+            print '%d of %d duplicate records generated so far' % \
+                  (self.num_dup_rec_created, self.number_of_mod_records)
+          else:
+            print print_line
+
+      else:
+        self.num_dup_rec_created += len(org_state['dup_list'])
+
+    return new_dup_rec_list
+
+  # ---------------------------------------------------------------------------
+
+  def __dup_rec_id_prefix__(self, org_rec_id):
+    """Helper method which returns the start of the identifiers of the
+       duplicates of the original record with the given identifier, which is
+       followed by the number of the duplicate.
+    """
+
+    org_rec_num = org_rec_id.split('-')[1]
+
+    return 'rec-%s-dup-' % (org_rec_num)
+
+  # ---------------------------------------------------------------------------
+
+  def __start_dup_try__(self, org_state, d, dup_try):
+    """Helper method which returns the state of a new try to generate
+       duplicate d of the given original record, as a dictionary.
+    """
+
+    org_rec_id_to_mod = org_state['org_rec_id']
+
+    dup_rec_id = '%s%d' % (org_state['dup_rec_id_prefix'], d)
+
+    # Random streams for this try, one to select attributes and corruptors,
+    # and one for each modified attribute (created when needed). The
+    # duplicate is not copied from the original record, only its modified
+    # values are kept (see '__dup_rec_list__').
     #
-    for (org_rec_id_to_mod, num_dups) in dup_rec_num_dict.iteritems():
-      assert (num_dups > 0) and (num_dups <= self.max_num_dup_per_rec)
+    dup_try_dict = {'org_state':           org_state,
+                    'd':                   d,
+                    'dup_try':             dup_try,
+                    'dup_rec_id':          dup_rec_id,
+                    'dup_val_dict':        {},  # Modified values
+                    'select_rng':          self.__stream__(org_rec_id_to_mod,
+                                                           d, dup_try,
+                                                           'select'),
+                    'attr_rng_dict':       {},
+                    'attr_mod_count_list': self.zero_mod_count_list[:],
+                    'num_mod_in_record':   0,  # Number of modified attributes
+                    'num_tries':           0,
+                    'mod_list':            [],
+                    'can_corrupt_dict':    {},
+                    'event_list':          [],
+                    'print_list':          []}
+
+    if (self.verbose == True):
+      dup_try_dict['print_list'].append('  Generate identifier for ' + \
+            'duplicate record based on "%s": %s' % (org_rec_id_to_mod,
+                                                     dup_rec_id))
+
+    return dup_try_dict
 
-      print
-      print 'Generating %d modified (duplicate) records for record "%s"' % \
-            (num_dups, org_rec_id_to_mod)
+  # ---------------------------------------------------------------------------
+
+  def __dup_val__(self, dup_try_dict, attr_index):
+    """Helper method which returns the current value of the attribute with
+       the given index in the duplicate of the given try.
+    """
 
-      rec_to_mod_list = rec_dict[org_rec_id_to_mod]
+    dup_val_dict = dup_try_dict['dup_val_dict']
 
-      d = 0  # Loop counter for duplicates for this record
+    if (attr_index in dup_val_dict):
+      return dup_val_dict[attr_index]
 
-      this_dup_rec_list = []  # A list of all duplicates for this record
+    return dup_try_dict['org_state']['rec_list'][attr_index]
 
-      # Loop to create duplicate records - - - - - - - - - - - - - - - - - - - -
-      #
-      while (d < num_dups):
+  # ---------------------------------------------------------------------------
 
-        # Create a duplicate of the original record
-        #
-        dup_rec_list = rec_to_mod_list[:] # Make copy of original record
+  def __dup_rec_list__(self, dup_try_dict):
+    """Helper method which returns the duplicate of the given try as a new
+       record list, the original record with the modified values inserted.
+    """
 
-        org_rec_num = org_rec_id_to_mod.split('-')[1]
-        dup_rec_id = 'rec-%s-dup-%d' % (org_rec_num, d)
-        print '  Generate identifier for duplicate record based on "%s": %s' \
-              % (org_rec_id_to_mod, dup_rec_id)
+    dup_rec_list = dup_try_dict['org_state']['rec_list'][:]
 
-        # Count the number of modifications in this record (counted as the
-        # number of modified attributes)
-        #
-        num_mod_in_record = 0
+    for (attr_index, attr_val) in dup_try_dict['dup_val_dict'].iteritems():
+      dup_rec_list[attr_index] = attr_val
 
-        # Set the attribute modification counters to zero for all attributes
-        # that can be modified
-        #
-        attr_mod_count_dict = {}
-        for attr_name in self.attr_mod_prob_dict.keys():
-          attr_mod_count_dict[attr_name] = 0
+    return dup_rec_list
 
-        # Abort generating modifications after a larger number of tries to
-        # prevent an endless loop
-        #
-        max_num_tries = self.num_mod_per_rec*10
-        num_tries =     0
+  # ---------------------------------------------------------------------------
 
-        # Now apply desired number of modifications to this record
-        #
-        while ((num_mod_in_record < self.num_mod_per_rec) and
-               (num_tries < max_num_tries)):
+  def __dup_fingerprint__(self, dup_try_dict):
+    """Helper method which returns the values of the duplicate of the given
+       try that are different from the original record, as a frozen set of
+       pairs (attribute index, value). Two duplicates of the same original
+       record have the same values if and only if their fingerprints are the
+       same, and the fingerprint of the original record is the empty set.
+    """
 
-          # Randomly modify an attribute value
-          #
-          r = random.random()  # Random value between 0.0 and 1.0
-          i = 0
-          while (self.attr_mod_prob_list[i][0] < r):
-            i += 1
-          mod_attr_name = self.attr_mod_prob_list[i][1]
-
-          if (attr_mod_count_dict[mod_attr_name] < self.max_num_mod_per_attr):
-            mod_attr_name_index = self.attribute_name_list.index(mod_attr_name)
-            mod_attr_val = dup_rec_list[mod_attr_name_index]
-
-            # Select an attribute to modify according to probability
-            # distribution of corruption methods
-            #
-            attr_mod_data_list = self.attr_mod_data_dict[mod_attr_name]
-
-            r = random.random()  # Random value between 0.0 and 1.0
-            p_sum = attr_mod_data_list[0][0]
-            i = 0
-            while (r >= p_sum):
-              i += 1
-              p_sum += attr_mod_data_list[i][0]
-            corruptor_method = attr_mod_data_list[i][1]
-            #record level handling =============start================
-            if mod_attr_name == 'crptr-record':
-              mod_rec_list = dup_rec_list[:]
-              new_rec_val = corruptor_method.corrupt_value(mod_rec_list)
-              org_rec_val = rec_to_mod_list[:]
-              if (new_rec_val != org_rec_val):
-                print '  Selected attribute for modification:', mod_attr_name
-                print '    Selected corruptor:', corruptor_method.name
-
-                # The following weird string printing construct is to overcome
-                # problems with printing non-ASCII characters
-                #
-                print '      Original record value:', str(org_rec_val)[1:-1]
-                print '      Modified record value:', str(new_rec_val)[1:-1]
-
-                dup_rec_list = new_rec_val
-
-                # One more modification for this attribute
-                #
-                attr_mod_count_dict[mod_attr_name] += 1
-
-                # The number of modifications in a record corresponds to the
-                # number of modified attributes
-                #
-                num_mod_in_record = 0
-
-                for num_attr_mods in attr_mod_count_dict.values():
-                  if (num_attr_mods > 0):
-                    num_mod_in_record += 1  # One more modification
-                  assert num_mod_in_record <= self.num_mod_per_rec
-
-              num_tries += 1  # One more try to modify record
-            
-            #record level handling =============end===============
-            else:
-
-              # Modify the value from the selected attribute
-              #
-              new_attr_val = corruptor_method.corrupt_value(mod_attr_val)
-
-              org_attr_val = rec_to_mod_list[mod_attr_name_index]
-
-              # If the modified value is different insert it back into modified
-              # record
-              #
-              if (new_attr_val != org_attr_val):
-                print '  Selected attribute for modification:', mod_attr_name
-                print '    Selected corruptor:', corruptor_method.name
-
-                # The following weird string printing construct is to overcome
-                # problems with printing non-ASCII characters
-                #
-                print '      Original attribute value:', str([org_attr_val])[1:-1]
-                print '      Modified attribute value:', str([new_attr_val])[1:-1]
-
-                dup_rec_list[mod_attr_name_index] = new_attr_val
-
-                # One more modification for this attribute
-                #
-                attr_mod_count_dict[mod_attr_name] += 1
-
-                # The number of modifications in a record corresponds to the
-                # number of modified attributes
-                #
-                num_mod_in_record = 0
-
-                for num_attr_mods in attr_mod_count_dict.values():
-                  if (num_attr_mods > 0):
-                    num_mod_in_record += 1  # One more modification
-                assert num_mod_in_record <= self.num_mod_per_rec
-
-              num_tries += 1  # One more try to modify record
-
-
-        # Check if this duplicate is different from all others for this original
-        # record
-        #
-        is_diff = True  # Flag to check if the latest duplicate is different
+    rec_to_mod_list = dup_try_dict['org_state']['rec_list']
 
-        if (this_dup_rec_list == []):  # No duplicate so far
-          this_dup_rec_list.append(dup_rec_list)
-        else:
-          for check_dup_rec in this_dup_rec_list:
-            if (check_dup_rec == dup_rec_list):  # Same as a previous duplicate
-              is_diff = False
-              print 'Same duplicate:', check_dup_rec
-              print '               ', dup_rec_list
-
-        if (is_diff == True):  # Only keep duplicate records that are different
-
-          # Safe the record into the overall record dictionary
-          #
-          rec_dict[dup_rec_id] = dup_rec_list
-
-          d += 1
-          num_dup_rec_created += 1
-
-          print 'Original record:'
-          print ' ', rec_to_mod_list
-          print 'Record with %d modified attributes' % (num_mod_in_record),
-          attr_mod_str = '('
-          for a in self.attribute_name_list:
-            if (attr_mod_count_dict.get(a,0) > 0):
-              attr_mod_str += '%d in %s, ' % (attr_mod_count_dict[a],a)
-          attr_mod_str = attr_mod_str[:-1]+'):'
-          print attr_mod_str
-          print ' ', dup_rec_list
-          print '%d of %d duplicate records generated so far' % \
-                (num_dup_rec_created, self.number_of_mod_records)
-          print
+    return frozenset([(attr_index, attr_val) for (attr_index, attr_val) in
+                      dup_try_dict['dup_val_dict'].iteritems()
+                      if (attr_val != rec_to_mod_list[attr_index])])
 
-    return rec_dict
+  # ---------------------------------------------------------------------------
+
+  def __select_modification__(self, dup_try_dict, attr_count_list):
+    """Helper method which randomly selects an attribute of the given try
+       that can still be modified (according to the given list with the
+       number of modifications of each attribute), then a corruptor for it,
+       according to the probability distributions of attributes and
+       corruption methods.
+
+       If 'check_can_corrupt' is True, only attributes and corruptors are
+       selected where the corruptor can modify the current value of the
+       attribute (by selecting again until one is found, which is the same as
+       normalising the probabilities of these attributes and corruptors).
+       Corruptors dropped because of their low success rate (see
+       'min_success_rate') are never selected.
+
+       Returns a tuple (attribute name, attribute index, corruptor index,
+       corruptor), or None if no attribute can be modified.
+    """
+
+    select_rng =           dup_try_dict['select_rng']
+    max_num_mod_per_attr = self.max_num_mod_per_attr
+
+    if ((self.check_can_corrupt == False) and (self.min_success_rate == None)):
+      (mod_attr_name, mod_attr_name_index, corruptor_sampler) = \
+                                      self.attr_sampler.sample(select_rng)
+      while (attr_count_list[mod_attr_name_index] >= max_num_mod_per_attr):
+        (mod_attr_name, mod_attr_name_index, corruptor_sampler) = \
+                                      self.attr_sampler.sample(select_rng)
+
+      (crpt_index, corruptor_method) = corruptor_sampler.sample(select_rng)
+
+      return (mod_attr_name, mod_attr_name_index, crpt_index,
+              corruptor_method)
+
+    # Once an attribute is selected that cannot be modified, check that
+    # there is an attribute that can be modified
+    #
+    checked_all = False
+
+    while True:
+      (mod_attr_name, mod_attr_name_index, corruptor_sampler) = \
+                                      self.attr_sampler.sample(select_rng)
+      if (attr_count_list[mod_attr_name_index] >= max_num_mod_per_attr):
+        continue
+
+      crpt_select = self.__select_corruptor__(dup_try_dict, mod_attr_name,
+                                              mod_attr_name_index,
+                                              corruptor_sampler, select_rng)
+      if (crpt_select != None):
+        (crpt_index, corruptor_method) = crpt_select
+        break
+
+      if (checked_all == False):
+        for (attr_name, attr_index) in self.mod_attr_list:
+          if ((attr_count_list[attr_index] < max_num_mod_per_attr) and \
+              (self.__can_select_attr__(dup_try_dict, attr_name,
+                                        attr_index) == True)):
+            checked_all = True
+            break
+        if (checked_all == False):
+          return None
+
+    return (mod_attr_name, mod_attr_name_index, crpt_index, corruptor_method)
+
+  # ---------------------------------------------------------------------------
+
+  def __select_corruptor__(self, dup_try_dict, attr_name, attr_index,
+                           corruptor_sampler, rng):
+    """Helper method which randomly selects a corruptor for the given
+       attribute of the given try with the given corruptor sampler and random
+       stream, by selecting again until one is found that can be selected
+       (see '__can_select__').
+
+       Returns a pair (corruptor index, corruptor), or None if all corruptors
+       of the attribute were found not to be selectable.
+    """
+
+    num_crpt =     self.num_crpt_dict[attr_name]
+    not_crpt_set = set()  # Corruptors that cannot be selected
+
+    while (len(not_crpt_set) < num_crpt):
+      (crpt_index, corruptor_method) = corruptor_sampler.sample(rng)
+
+      if (self.__can_select__(dup_try_dict, attr_name, attr_index,
+                              crpt_index) == True):
+        return (crpt_index, corruptor_method)
+      not_crpt_set.add(crpt_index)
+
+    return None
+
+  # ---------------------------------------------------------------------------
+
+  def __can_corrupt__(self, dup_try_dict, attr_name, attr_index, crpt_index):
+    """Helper method which returns True if the corruptor with the given index
+       can modify the current value of the given attribute in the given try.
+       The results are kept in the try until the attribute is modified.
+    """
+
+    attr_can_corrupt_dict = \
+                dup_try_dict['can_corrupt_dict'].setdefault(attr_name, {})
+
+    if (crpt_index not in attr_can_corrupt_dict):
+      if (attr_name == 'crptr-record'):
+        attr_val = self.__dup_rec_list__(dup_try_dict)
+      else:
+        attr_val = self.__dup_val__(dup_try_dict, attr_index)
+
+      corruptor = self.attr_mod_data_dict[attr_name][crpt_index][1]
+      attr_can_corrupt_dict[crpt_index] = corruptor.can_corrupt(attr_val)
+
+    return attr_can_corrupt_dict[crpt_index]
+
+  # ---------------------------------------------------------------------------
+
+  def __can_select__(self, dup_try_dict, attr_name, attr_index, crpt_index):
+    """Helper method which returns True if the corruptor with the given index
+       can be selected for the given attribute in the given try: if it was not
+       dropped, and (if 'check_can_corrupt' is True) it can modify the current
+       value of the attribute.
+    """
+
+    if (crpt_index in self.dropped_crpt_dict[attr_name]):
+      return False
+
+    if (self.check_can_corrupt == False):
+      return True
+
+    return self.__can_corrupt__(dup_try_dict, attr_name, attr_index,
+                                crpt_index)
+
+  # ---------------------------------------------------------------------------
+
+  def __can_select_attr__(self, dup_try_dict, attr_name, attr_index):
+    """Helper method which returns True if any corruptor (with a probability
+       larger than 0.0) can be selected for the given attribute in the given
+       try.
+    """
+
+    for (crpt_index, (crpt_prob, corruptor)) in \
+        enumerate(self.attr_mod_data_dict[attr_name]):
+      if ((crpt_prob > 0.0) and \
+          (self.__can_select__(dup_try_dict, attr_name, attr_index,
+                               crpt_index) == True)):
+        return True
+
+    return False
+
+  # ---------------------------------------------------------------------------
+
+  def __modify_dup_tries__(self, dup_try_list):
+    """Helper method which applies modifications to the given tries to
+       generate duplicates until each has 'num_mod_per_rec' modified
+       attributes (or too many tries were needed).
+
+       In each round one attribute of every try that still needs modifications
+       is selected together with a corruptor, and the values of all tries
+       selected for the same corruptor are then corrupted in one batch.
+    """
+
+    # Abort generating modifications after a larger number of tries to
+    # prevent an endless loop
+    #
+    max_num_tries = self.num_mod_per_rec*10
+
+    while (dup_try_list != []):
+
+      corruptor_list = []  # The corruptors selected, in order of selection
+      work_dict =      {}  # For each corruptor the values to be modified
+
+      for dup_try_dict in dup_try_list:
+        mod_select = self.__select_modification__(dup_try_dict,
+                                        dup_try_dict['attr_mod_count_list'])
+
+        if (mod_select == None):  # No attribute can be modified any more
+          dup_try_dict['num_tries'] = max_num_tries
+          continue
+
+        (mod_attr_name, mod_attr_name_index, crpt_index, corruptor_method) = \
+                                                                  mod_select
+
+        dup_try_dict['mod_list'].append((mod_attr_name_index, crpt_index))
+
+        if (corruptor_method not in work_dict):
+          corruptor_list.append(corruptor_method)
+          work_dict[corruptor_method] = []
+        work_dict[corruptor_method].append((dup_try_dict, mod_attr_name,
+                                            mod_attr_name_index, crpt_index))
+
+      self.__corrupt_batches__(corruptor_list, work_dict)
+
+      # Keep the tries which need more modifications
+      #
+      next_dup_try_list = []
+      for dup_try_dict in dup_try_list:
+        if ((dup_try_dict['num_mod_in_record'] < self.num_mod_per_rec) and
+            (dup_try_dict['num_tries'] < max_num_tries)):
+          next_dup_try_list.append(dup_try_dict)
+      dup_try_list = next_dup_try_list
+
+  # ---------------------------------------------------------------------------
+
+  def __modify_dup_tries_by_column__(self, dup_try_list):
+    """Helper method which applies modifications to the given tries to
+       generate duplicates like '__modify_dup_tries__', but column by column.
+
+       In each round all attributes and corruptors still needed by every try
+       are selected first (each with the number of times its attribute was
+       selected in this try). The selected values are then corrupted in one
+       batch for each attribute and corruptor, first the values selected once
+       for each attribute in the order of 'attribute_name_list' (and then the
+       record level corruptors), then the values selected a second time, and
+       so on. Modifications that did not change a value are selected again in
+       the next round.
+    """
+
+    max_num_tries = self.num_mod_per_rec*10
+
+    num_attr = len(self.attribute_name_list)
+
+    while (dup_try_list != []):
+
+      # For each batch as a tuple (selection number, column, corruptor index)
+      # the list of values to be modified
+      #
+      batch_dict = {}
+
+      for dup_try_dict in dup_try_list:
+        attr_mod_count_list = dup_try_dict['attr_mod_count_list']
+
+        sel_count_list = attr_mod_count_list[:]  # Including selections
+        num_mod_attr =   dup_try_dict['num_mod_in_record']
+        num_tries =      dup_try_dict['num_tries']
+
+        while ((num_mod_attr < self.num_mod_per_rec) and
+               (num_tries < max_num_tries)):
+
+          mod_select = self.__select_modification__(dup_try_dict,
+                                                    sel_count_list)
+
+          if (mod_select == None):  # No attribute can be modified any more
+            if (num_tries == dup_try_dict['num_tries']):
+              dup_try_dict['num_tries'] = max_num_tries
+            break
+
+          (mod_attr_name, mod_attr_name_index, crpt_index,
+           corruptor_method) = mod_select
+
+          if (sel_count_list[mod_attr_name_index] == 0):
+            num_mod_attr += 1
+          sel_count_list[mod_attr_name_index] += 1
+          num_tries +=                           1
+
+          sel_num = sel_count_list[mod_attr_name_index] - \
+                    attr_mod_count_list[mod_attr_name_index]
+
+          if (mod_attr_name == 'crptr-record'):
+            batch_key = (sel_num, num_attr, crpt_index)
+          else:
+            batch_key = (sel_num, mod_attr_name_index, crpt_index)
+
+          if (batch_key not in batch_dict):
+            batch_dict[batch_key] = (corruptor_method, [])
+          batch_dict[batch_key][1].append((dup_try_dict, mod_attr_name,
+                                           mod_attr_name_index, crpt_index))
+
+      # Corrupt the values of one attribute and corruptor at a time, and list
+      # the modifications of each try in the order they are applied
+      #
+      for batch_key in sorted(batch_dict.keys()):
+        (corruptor_method, work_list) = batch_dict[batch_key]
+
+        for (dup_try_dict, mod_attr_name, mod_attr_name_index, crpt_index) in \
+            work_list:
+          dup_try_dict['mod_list'].append((mod_attr_name_index, crpt_index))
+
+        self.__corrupt_batches__([corruptor_method],
+                                 {corruptor_method: work_list})
+
+      # Keep the tries which need more modifications
+      #
+      next_dup_try_list = []
+      for dup_try_dict in dup_try_list:
+        if ((dup_try_dict['num_mod_in_record'] < self.num_mod_per_rec) and
+            (dup_try_dict['num_tries'] < max_num_tries)):
+          next_dup_try_list.append(dup_try_dict)
+      dup_try_list = next_dup_try_list
+
+  # ---------------------------------------------------------------------------
+
+  def __corrupt_batches__(self, corruptor_list, work_dict):
+    """Helper method which corrupts the values selected in one round of
+       modifications, in one batch for each corruptor in the given list. The
+       given dictionary contains for each corruptor a list of tuples (try to
+       generate a duplicate, attribute name, attribute index, index of the
+       corruptor in the list of corruptors of the attribute).
+    """
+
+    for corruptor_method in corruptor_list:
+      work_list = work_dict[corruptor_method]
+
+      in_val_list = []
+      rng_list =    []
+      for (dup_try_dict, mod_attr_name, mod_attr_name_index, crpt_index) in \
+          work_list:
+        if (mod_attr_name == 'crptr-record'):
+          in_val_list.append(self.__dup_rec_list__(dup_try_dict))
+        else:
+          in_val_list.append(self.__dup_val__(dup_try_dict,
+                                              mod_attr_name_index))
+
+        attr_rng_dict = dup_try_dict['attr_rng_dict']
+        if (mod_attr_name not in attr_rng_dict):
+          org_state = dup_try_dict['org_state']
+          attr_rng_dict[mod_attr_name] = \
+                 self.__stream__(org_state['org_rec_id'], dup_try_dict['d'],
+                                 dup_try_dict['dup_try'], mod_attr_name)
+        rng_list.append(attr_rng_dict[mod_attr_name])
+
+      new_val_list = self.__corrupt_with_streams__(corruptor_method,
+                                                   in_val_list, rng_list)
+
+      for i in xrange(len(work_list)):
+        (dup_try_dict, mod_attr_name, mod_attr_name_index, crpt_index) = \
+                                                                 work_list[i]
+
+        self.__apply_modification__(dup_try_dict, mod_attr_name,
+                                    mod_attr_name_index, crpt_index,
+                                    corruptor_method, in_val_list[i],
+                                    new_val_list[i])
+
+  # ---------------------------------------------------------------------------
+
+  def __apply_modification__(self, dup_try_dict, mod_attr_name,
+                             mod_attr_name_index, crpt_index,
+                             corruptor_method, mod_val, new_val):
+    """Helper method which inserts the given modified attribute value (or
+       modified record list, for the record level corruptors) into the
+       duplicate of the given try if it is different from the original, and
+       counts the attempt of the corruptor.
+    """
+
+    rec_to_mod_list = dup_try_dict['org_state']['rec_list']
+
+    if (mod_attr_name == 'crptr-record'):
+      org_val = rec_to_mod_list
+    else:
+      org_val = rec_to_mod_list[mod_attr_name_index]
+
+    self.__count_attempt__(mod_attr_name, crpt_index, (new_val != org_val))
+
+    # If the modified value is different insert it back into modified record
+    #
+    if (new_val != org_val):
+      if (self.verbose == True):
+
+        # The following weird string printing construct is to overcome
+        # problems with printing non-ASCII characters
+        #
+        if (mod_attr_name == 'crptr-record'):
+          org_val_str = 'Original record value: ' + str(org_val)[1:-1]
+          new_val_str = 'Modified record value: ' + str(new_val)[1:-1]
+        else:
+          org_val_str = 'Original attribute value: ' + str([org_val])[1:-1]
+          new_val_str = 'Modified attribute value: ' + str([new_val])[1:-1]
+
+        dup_try_dict['print_list'] += \
+             ['  Selected attribute for modification: ' + mod_attr_name,
+              '    Selected corruptor: ' + corruptor_method.name,
+              '      ' + org_val_str,
+              '      ' + new_val_str]
+
+      if (self.event_log_file_name != None):
+        dup_try_dict['event_list'].append((mod_attr_name,
+                                           corruptor_method.name,
+                                           mod_val, new_val,
+                                           dup_try_dict['num_tries']+1))
+
+      # A modified record list replaces all modified values
+      #
+      dup_val_dict = dup_try_dict['dup_val_dict']
+      if (mod_attr_name == 'crptr-record'):
+        dup_val_dict.clear()
+        for (attr_index, attr_val) in enumerate(new_val):
+          if (attr_val != rec_to_mod_list[attr_index]):
+            dup_val_dict[attr_index] = attr_val
+      else:
+        dup_val_dict[mod_attr_name_index] = new_val
+
+      # The corruptors that can modify the changed values are not known
+      #
+      can_corrupt_dict = dup_try_dict['can_corrupt_dict']
+      if (mod_attr_name == 'crptr-record'):
+        can_corrupt_dict.clear()
+      else:
+        can_corrupt_dict.pop(mod_attr_name, None)
+        can_corrupt_dict.pop('crptr-record', None)
+
+      # One more modification for this attribute. The number of
+      # modifications in a record corresponds to the number of modified
+      # attributes.
+      #
+      attr_mod_count_list = dup_try_dict['attr_mod_count_list']
+
+      if (attr_mod_count_list[mod_attr_name_index] == 0):
+        dup_try_dict['num_mod_in_record'] += 1  # One more modification
+        assert dup_try_dict['num_mod_in_record'] <= self.num_mod_per_rec
+      attr_mod_count_list[mod_attr_name_index] += 1
+
+    dup_try_dict['num_tries'] += 1  # One more try to modify record
+
+  # ---------------------------------------------------------------------------
+
+  def __check_dup_tries__(self, org_state):
+    """Helper method which checks the finished tries of the given original
+       record in the order of its duplicates, and keeps duplicates that are
+       different from the original record and all its duplicates before (and
+       from all other records if 'unique_records' is True).
+
+       Returns a list with the new try for the first duplicate that was not
+       different, or an empty list. After 'max_dup_tries' tries for the same
+       duplicate no more duplicates are generated for the original record.
+    """
+
+    while (org_state['next_d'] < org_state['num_dups']):
+      d = org_state['next_d']
+      dup_try_dict = org_state['try_dict'][d]
+
+      if (self.verbose == True):
+        org_state['print_list'] += dup_try_dict['print_list']
+
+      dup_fingerprint = self.__dup_fingerprint__(dup_try_dict)
+
+      # The values of the duplicate are only copied into a new record list
+      # when needed, usually only if it is kept
+      #
+      dup_rec_list = None
+
+      if (dup_fingerprint in org_state['fingerprint_set']):
+        same_str = 'Same as original or previous duplicate: '
+      else:
+        same_str = None
+
+        if (self.unique_filter != None):
+          dup_rec_list = self.__dup_rec_list__(dup_try_dict)
+          if (self.unique_filter.add(repr(dup_rec_list)) == True):
+            same_str = 'Same as another record: '
+            self.num_unique_collisions += 1
+
+      if (same_str != None):
+        if (self.verbose == True):
+          org_state['print_list'].append(same_str + \
+                            str(self.__dup_rec_list__(dup_try_dict)))
+
+        if (dup_try_dict['dup_try']+1 >= self.max_dup_tries):
+          if (self.verbose == True):
+            org_state['print_list'].append('No different duplicate ' + \
+                  'found in %d tries, only %d of %d duplicates generated' % \
+                  (self.max_dup_tries, d, org_state['num_dups_assigned']))
+          org_state['num_dups'] = d  # Give up on the remaining duplicates
+          break
+
+        dup_try_dict = self.__start_dup_try__(org_state, d,
+                                              dup_try_dict['dup_try']+1)
+        org_state['try_dict'][d] = dup_try_dict
+
+        return [dup_try_dict]
+
+      org_state['fingerprint_set'].add(dup_fingerprint)
+
+      if (dup_rec_list == None):
+        dup_rec_list = self.__dup_rec_list__(dup_try_dict)
+
+      # Safe the record into the list of duplicates for this record
+      #
+      dup_rec_id = dup_try_dict['dup_rec_id']
+      org_state['dup_list'].append((dup_rec_id, dup_rec_list))
+
+      self.plan_dup_list.append((org_state['org_rec_id'], d,
+                                 dup_try_dict['dup_try'],
+                                 dup_try_dict['mod_list'],
+                                 org_state['digest']))
+
+      self.__add_events__(dup_try_dict)
+
+      if (self.verbose == True):
+        attr_mod_count_list = dup_try_dict['attr_mod_count_list']
+
+        attr_mod_str = '('
+        for (i, a) in enumerate(self.attribute_name_list):
+          if (attr_mod_count_list[i] > 0):
+            attr_mod_str += '%d in %s, ' % (attr_mod_count_list[i],a)
+        attr_mod_str = attr_mod_str[:-1]+'):'
+
+        org_state['print_list'] += \
+             ['Original record:',
+              '  ' + str(org_state['rec_list']),
+              'Record with %d modified attributes %s' % \
+              (dup_try_dict['num_mod_in_record'], attr_mod_str),
+              '  ' + str(dup_rec_list),
+              None,  # Count of duplicates generated so far
+              '']
+
+      del org_state['try_dict'][d]
+      org_state['next_d'] = d + 1
+
+    return []
+
+  # ---------------------------------------------------------------------------
+
+  def __add_events__(self, dup_try_dict):
+    """Helper method which adds the events of the modifications of the given
+       try to generate a duplicate to the list of events to be written.
+    """
+
+    org_rec_id = dup_try_dict['org_state']['org_rec_id']
+    dup_rec_id = dup_try_dict['dup_rec_id']
+    dup_try =    dup_try_dict['dup_try']
+
+    for (mod_attr_name, corruptor_name, org_val, new_val, num_tries) in \
+        dup_try_dict['event_list']:
+      self.event_list.append({'org_rec_id': org_rec_id,
+                              'dup_rec_id': dup_rec_id,
+                              'attribute':  mod_attr_name,
+                              'corruptor':  corruptor_name,
+                              'org_val':    org_val,
+                              'new_val':    new_val,
+                              'num_tries':  num_tries,
+                              'dup_try':    dup_try})
+
+  # ---------------------------------------------------------------------------
+
+  def __open_event_log__(self, checkpoint_dict=None):
+    """Helper method which opens the event log if an event log file name was
+       given. If a checkpoint is given, the events written after it are
+       removed from the log.
+    """
+
+    self.event_list = []
+
+    if (self.event_log_file_name != None):
+      if (checkpoint_dict == None):
+        self.event_log = CorruptionEventLog(self.event_log_file_name)
+      else:
+        self.event_log = CorruptionEventLog(self.event_log_file_name,
+                                 resume_offset=checkpoint_dict['event_offset'])
+
+  # ---------------------------------------------------------------------------
+
+  def __write_events__(self):
+    """Helper method which passes the events collected so far to the event
+       log. Without an open event log (as in worker processes) the events are
+       kept.
+    """
+
+    if (self.event_log != None):
+      self.event_log.add_events(self.event_list)
+      self.event_list = []
+
+  # ---------------------------------------------------------------------------
+
+  def __close_event_log__(self):
+    """Helper method which writes the remaining events and closes the event
+       log.
+    """
+
+    if (self.event_log != None):
+      self.__write_events__()
+      self.event_log.close()
+      self.event_log = None
+
+  # ---------------------------------------------------------------------------
+
+  def __checkpoint_settings__(self):
+    """Helper method which returns the settings that need to be the same to
+       resume a run from a checkpoint.
+    """
+
+    return (self.number_of_org_records, self.number_of_mod_records,
+            self.attribute_name_list, self.max_num_dup_per_rec,
+            self.num_dup_dist, self.num_mod_per_rec, self.max_num_mod_per_attr,
+            sorted(self.attr_mod_prob_dict.items()), self.random_seed,
+            self.engine, self.check_can_corrupt, self.min_success_rate,
+            self.min_success_attempts, self.max_dup_tries,
+            self.unique_records, self.unique_error_rate, self.num_shards,
+            self.shard_index)
+
+  # ---------------------------------------------------------------------------
+
+  def __read_checkpoint__(self):
+    """Helper method which returns the dictionary saved in the checkpoint
+       file if the run is to be resumed and the file exists, otherwise None.
+    """
+
+    if ((self.checkpoint_file_name == None) or (self.resume == False) or \
+        (not os.path.isfile(self.checkpoint_file_name))):
+      return None
+
+    try:
+      checkpoint_file = open(self.checkpoint_file_name, 'rb')
+      checkpoint_dict = cPickle.load(checkpoint_file)
+      checkpoint_file.close()
+    except:
+      raise IOError, 'Cannot read checkpoint file "%s"' % \
+                     (self.checkpoint_file_name)
+
+    if (checkpoint_dict['settings'] != self.__checkpoint_settings__()):
+      raise Exception, 'Checkpoint file "%s" was written with different ' % \
+                       (self.checkpoint_file_name) + 'settings'
+
+    if (self.verbose == True):
+      print 'Resume from checkpoint after %d original records' % \
+            (checkpoint_dict['org_rec_i'])
+
+    return checkpoint_dict
+
+  # ---------------------------------------------------------------------------
+
+  def __open_journal__(self, checkpoint_dict):
+    """Helper method which opens the journal file of the duplicates generated.
+       If a checkpoint is given, the duplicates up to this checkpoint are read
+       from the journal, later ones are removed, and the state of the random
+       generator is restored.
+
+       Returns the number of original records processed, the list of
+       duplicates generated up to the checkpoint, and the list of these
+       duplicates for the plan.
+    """
+
+    journal_file_name = self.checkpoint_file_name + '.dups'
+
+    if (checkpoint_dict == None):
+
+      # Remove the checkpoint of an earlier run, it does not match the new
+      # journal
+      #
+      if (os.path.isfile(self.checkpoint_file_name)):
+        os.remove(self.checkpoint_file_name)
+
+      self.journal_file =      open(journal_file_name, 'wb')
+      self.last_checkpoint_i = 0
+
+      return 0, [], []
+
+    self.journal_file = open(journal_file_name, 'r+b')
+
+    new_dup_rec_list = []
+    plan_dup_list =    []
+
+    while (self.journal_file.tell() < checkpoint_dict['journal_offset']):
+      chunk_len = int(self.journal_file.readline())
+      (chunk_dup_rec_list, chunk_plan_dup_list) = \
+                           cPickle.loads(self.journal_file.read(chunk_len))
+      new_dup_rec_list += chunk_dup_rec_list
+      plan_dup_list +=    chunk_plan_dup_list
+
+    if (self.journal_file.tell() != checkpoint_dict['journal_offset']):
+      raise Exception, 'Journal file "%s" does not match checkpoint' % \
+                       (journal_file_name)
+    self.journal_file.truncate()
+
+    if (self.random_seed == None):
+      random.setstate(checkpoint_dict['rng_state'])
+
+    self.last_checkpoint_i = checkpoint_dict['org_rec_i']
+
+    return checkpoint_dict['org_rec_i'], new_dup_rec_list, plan_dup_list
+
+  # ---------------------------------------------------------------------------
+
+  def __write_checkpoint__(self, org_rec_i, num_org_rec, dup_rec_num_array,
+                           chunk_dup_rec_list, chunk_plan_dup_list):
+    """Helper method which appends the given duplicates (and the same
+       duplicates for the plan) to the journal, and saves a checkpoint if
+       'checkpoint_interval' more original records have been processed since
+       the last checkpoint, or all 'num_org_rec' original records are done.
+    """
+
+    chunk_str = cPickle.dumps((chunk_dup_rec_list, chunk_plan_dup_list), 2)
+    self.journal_file.write('%d\n' % (len(chunk_str)))
+    self.journal_file.write(chunk_str)
+
+    if ((org_rec_i - self.last_checkpoint_i < self.checkpoint_interval) and \
+        (org_rec_i < num_org_rec)):
+      return
+
+    # Make sure all duplicates and events are on disk before the checkpoint
+    #
+    self.journal_file.flush()
+    os.fsync(self.journal_file.fileno())
+
+    if (self.event_log != None):
+      event_offset = self.event_log.sync()
+    else:
+      event_offset = None
+
+    checkpoint_dict = {'settings':          self.__checkpoint_settings__(),
+                       'dup_rec_num_array': dup_rec_num_array,
+                       'org_rec_i':         org_rec_i,
+                       'journal_offset':    self.journal_file.tell(),
+                       'event_offset':      event_offset,
+                       'rng_state':         random.getstate(),
+                       'corruptor_stats':   self.corruptor_stats_dict,
+                       'dropped_crpt':      self.dropped_crpt_dict}
+
+    # Write into a temporary file first so the last checkpoint is not lost if
+    # the process is killed while writing
+    #
+    tmp_file_name = self.checkpoint_file_name + '.tmp'
+    tmp_file = open(tmp_file_name, 'wb')
+    cPickle.dump(checkpoint_dict, tmp_file, 2)
+    tmp_file.flush()
+    os.fsync(tmp_file.fileno())
+    tmp_file.close()
+    os.rename(tmp_file_name, self.checkpoint_file_name)
+
+    self.last_checkpoint_i = org_rec_i
+
+  # ---------------------------------------------------------------------------
+
+  def __close_journal__(self):
+    """Helper method which closes the journal file if it is open.
+    """
+
+    if (self.journal_file != None):
+      self.journal_file.close()
+      self.journal_file = None
+
+  # ---------------------------------------------------------------------------
+
+  def __stream__(self, *key_list):
+    """Helper method which returns the keyed random stream for the given key
+       values if a 'random_seed' was given, otherwise the global random
+       generator.
+    """
+
+    if (self.random_seed == None):
+      return random
+
+    return keyedrandom.keyed_stream(self.random_seed, *key_list)
+
+  # ---------------------------------------------------------------------------
+
+  def __corrupt_with_streams__(self, corruptor_method, in_val_list, rng_list):
+    """Helper method which corrupts the given values (or record lists) with
+       the given corruptor in one batch, the i-th value with random values
+       drawn from the i-th stream. Without a seed all streams are the 'random'
+       module, so the corruptor can draw the random values of the whole batch
+       together.
+    """
+
+    if (self.random_seed == None):
+      return corruptor_method.corrupt_values(in_val_list)
+
+    return corruptor_method.corrupt_values(in_val_list, rng_list)
+
+  # ---------------------------------------------------------------------------
+
+  def regenerate_duplicate(self, org_rec_id, rec_to_mod_list, dup_num):
+    """Method to generate again the duplicate with the given number (starting
+       at 0) of the given original record, without corrupting any other
+       original record. This requires that a 'random_seed' was given.
+
+       Returns a pair (duplicate record identifier, duplicate record list)
+       which is the same as generated by 'corrupt_records' with the same seed.
+    """
+
+    if (self.random_seed == None):
+      raise Exception, 'Duplicates can only be regenerated if a ' + \
+                       '"random_seed" is given'
+    basefunctions.check_is_integer('dup_num', dup_num)
+    basefunctions.check_is_not_negative('dup_num', dup_num)
+
+    # Earlier duplicates of this record are needed to check the duplicate is
+    # different from them
+    #
+    dup_rec_list = self.__create_duplicates__([(org_rec_id, rec_to_mod_list,
+                                                dup_num+1)])
+    self.plan_dup_list = []
+
+    if (len(dup_rec_list) <= dup_num):
+      raise Exception, 'Duplicate %d of record "%s" could not be generated' % \
+                       (dup_num, org_rec_id)
+
+    return dup_rec_list[-1]
+
+  # ---------------------------------------------------------------------------
+
+  def plan_records(self, rec_dict, org_rec_id_list=None):
+    """Method to make the plan of the duplicates for the records in the given
+       record dictionary (and order of their identifiers, see
+       'corrupt_records'), without changing the dictionary. Returns the plan
+       (see 'corruptionplan.CorruptionPlan'), which can be saved, inspected,
+       and applied with 'apply_plan'.
+
+       As whether a modification is kept depends on the modified value, the
+       corruptors are applied while the plan is made.
+    """
+
+    self.corrupt_records(dict(rec_dict), org_rec_id_list)
+
+    return self.corruption_plan
+
+  # ---------------------------------------------------------------------------
+
+  def apply_plan(self, plan, rec_dict):
+    """Method to generate the duplicates of the given plan for the original
+       records in the given record dictionary, and insert them into the
+       dictionary, which is returned. This requires that a 'random_seed' was
+       given, and the plan was made with the same seed and corruptors.
+
+       No attributes and corruptors are selected, and the duplicates are not
+       checked again. Instead the modifications of the plan are applied in
+       bulk, in rounds where the values of all duplicates to be modified by
+       the same corruptor are corrupted in one batch. For the same original
+       records the duplicates are the same as those generated when the plan
+       was made.
+    """
+
+    self.__check_plan__(plan)
+
+    chunk_size = 10000  # Number of duplicates generated together
+
+    self.num_dup_rec_created = 0
+
+    self.__reset_corruptor_stats__()
+
+    new_dup_rec_list = []
+
+    self.__open_event_log__()
+    try:
+      for start_i in xrange(0, plan.num_duplicates(), chunk_size):
+        end_i = min(start_i+chunk_size, plan.num_duplicates())
+
+        new_dup_rec_list += self.__apply_plan_chunk__(plan, rec_dict,
+                                                      start_i, end_i)
+        self.__write_events__()
+
+        if (self.verbose == True):
+          print '%d of %d duplicate records generated from plan' % \
+                (self.num_dup_rec_created, plan.num_duplicates())
+    finally:
+      self.__close_event_log__()
+
+    for (dup_rec_id, dup_rec_list) in new_dup_rec_list:
+      rec_dict[dup_rec_id] = dup_rec_list
+
+    return rec_dict
+
+  # ---------------------------------------------------------------------------
+
+  def replay_plan(self, plan, rec_iter, prev_dup_dict=None):
+    """Method to generate the duplicates of the given plan again for a new
+       version of the original records, in a single pass over the records
+       given by an iterator (as pairs (record identifier, record list)). Like
+       'corrupt_records_stream' this is a generator which yields each original
+       record followed by its duplicates.
+
+       The same original records, attributes and corruptors are used as when
+       the plan was made (see 'apply_plan'). If a dictionary with the
+       duplicates generated earlier (for example from the data set the plan
+       was made for) is given, the duplicates of original records that did
+       not change since the plan was made are taken from this dictionary, and
+       the corruptors are only applied for the changed original records.
+
+       Duplicates of changed original records are not checked again to be
+       different from each other. Events are only written for duplicates that
+       are generated again.
+    """
+
+    self.__check_plan__(plan)
+
+    if (prev_dup_dict != None):
+      basefunctions.check_is_dictionary('prev_dup_dict', prev_dup_dict)
+
+    org_dup_range_dict = plan.org_dup_range_dict()
+
+    self.num_dup_rec_created = 0
+
+    self.__reset_corruptor_stats__()
+
+    self.__open_event_log__()
+    try:
+      for rec in self.__replay_plan__(plan, rec_iter, prev_dup_dict,
+                                      org_dup_range_dict):
+        yield rec
+    finally:
+      self.__close_event_log__()
+
+  # ---------------------------------------------------------------------------
+
+  def __replay_plan__(self, plan, rec_iter, prev_dup_dict, org_dup_range_dict):
+    """Helper generator for 'replay_plan' which reads the original records
+       and yields them together with their duplicates.
+    """
+
+    num_org_rec_found = 0  # Original records of the plan that were given
+    num_dup_rec_kept =  0  # Duplicates taken from the earlier duplicates
+
+    for (org_rec_id, rec_list) in rec_iter:
+
+      yield (org_rec_id, rec_list)
+
+      if (org_rec_id not in org_dup_range_dict):
+        continue  # No duplicates for this record
+      num_org_rec_found += 1
+
+      (org_i, start_i, end_i) = org_dup_range_dict[org_rec_id]
+
+      # Check if this record is unchanged and its duplicates are available
+      #
+      new_dup_rec_list = None
+
+      if ((prev_dup_dict != None) and \
+          (plan.org_digest_list[org_i] == \
+           corruptionplan.record_digest(rec_list))):
+        new_dup_rec_list =  []
+        dup_rec_id_prefix = self.__dup_rec_id_prefix__(org_rec_id)
+        for dup_i in xrange(start_i, end_i):
+          dup_rec_id = '%s%d' % (dup_rec_id_prefix, plan.dup_num_array[dup_i])
+          if (dup_rec_id not in prev_dup_dict):
+            new_dup_rec_list = None
+            break
+          new_dup_rec_list.append((dup_rec_id, prev_dup_dict[dup_rec_id]))
+
+      if (new_dup_rec_list != None):
+        num_dup_rec_kept +=         len(new_dup_rec_list)
+        self.num_dup_rec_created += len(new_dup_rec_list)
+
+      else:
+        new_dup_rec_list = self.__apply_plan_chunk__(plan,
+                                                     {org_rec_id: rec_list},
+                                                     start_i, end_i)
+        self.__write_events__()
+
+      for dup_rec in new_dup_rec_list:
+        yield dup_rec
+
+    if (num_org_rec_found < len(org_dup_range_dict)):
+      raise Exception, 'Only %d of %d original records of plan given' % \
+                       (num_org_rec_found, len(org_dup_range_dict))
+
+    if (self.verbose == True):
+      print '%d duplicate records replayed from plan, %d of them unchanged' % \
+            (self.num_dup_rec_created, num_dup_rec_kept)
+
+  # ---------------------------------------------------------------------------
+
+  def __apply_plan_chunk__(self, plan, rec_dict, start_i, end_i):
+    """Helper method which generates the duplicates of the given plan from
+       index 'start_i' up to (excluding) 'end_i', and returns them as a list of
+       pairs (duplicate record identifier, duplicate record list).
+    """
+
+    dup_try_list = []
+    org_state =    None
+
+    for dup_i in xrange(start_i, end_i):
+      (org_rec_id, dup_num, dup_try, mod_list) = plan.get_duplicate(dup_i)
+
+      if ((org_state == None) or (org_state['org_rec_id'] != org_rec_id)):
+        if (org_rec_id not in rec_dict):
+          raise Exception, 'Original record "%s" of plan not given' % \
+                           (org_rec_id)
+        org_state = {'org_rec_id':        org_rec_id,
+                     'rec_list':          rec_dict[org_rec_id],
+                     'dup_rec_id_prefix': self.__dup_rec_id_prefix__( \
+                                                               org_rec_id)}
+
+      dup_try_dict = self.__start_dup_try__(org_state, dup_num, dup_try)
+      dup_try_dict['mod_list'] = mod_list
+      dup_try_list.append(dup_try_dict)
+
+    # In round i the i-th modification of each duplicate is applied
+    #
+    mod_try_list = dup_try_list
+    mod_i =        0
+
+    while (mod_try_list != []):
+      corruptor_list = []  # The corruptors used, in order of the duplicates
+      work_dict =      {}  # For each corruptor the values to be modified
+
+      for dup_try_dict in mod_try_list:
+        (attr_index, crpt_index) = dup_try_dict['mod_list'][mod_i]
+
+        mod_attr_name =    self.attribute_name_list[attr_index]
+        corruptor_method = self.attr_mod_data_dict[mod_attr_name] \
+                                                  [crpt_index][1]
+
+        if (corruptor_method not in work_dict):
+          corruptor_list.append(corruptor_method)
+          work_dict[corruptor_method] = []
+        work_dict[corruptor_method].append((dup_try_dict, mod_attr_name,
+                                            attr_index, crpt_index))
+
+      self.__corrupt_batches__(corruptor_list, work_dict)
+
+      mod_i += 1
+
+      next_mod_try_list = []
+      for dup_try_dict in mod_try_list:
+        if (len(dup_try_dict['mod_list']) > mod_i):
+          next_mod_try_list.append(dup_try_dict)
+      mod_try_list = next_mod_try_list
+
+    new_dup_rec_list = []
+
+    for dup_try_dict in dup_try_list:
+      new_dup_rec_list.append((dup_try_dict['dup_rec_id'],
+                               self.__dup_rec_list__(dup_try_dict)))
+      self.__add_events__(dup_try_dict)
+
+    self.num_dup_rec_created += len(new_dup_rec_list)
+
+    return new_dup_rec_list
+
+  # ---------------------------------------------------------------------------
+
+  def apply_config_changes(self, plan, rec_dict):
+    """Method to update a data set generated with the given plan after the
+       corruptors of some attributes have been changed (in
+       'attr_mod_data_dict'), without generating all duplicates again. The
+       given record dictionary has to contain the original records and the
+       duplicates generated with the plan. The duplicates with modifications
+       of changed attributes are replaced, and the dictionary is returned. A
+       new plan for the changed corruptors is kept in 'corruption_plan'.
+
+       This requires that a 'random_seed' was given, and the plan was made
+       with the same seed, attributes and settings other than the corruptors.
+       The attributes with changed corruptors are found by comparing the
+       digests of their corruptors with those kept in the plan.
+
+       The modifications of the plan are applied again to each duplicate with
+       modifications of changed attributes, where for each modification of a
+       changed attribute a new corruptor is selected from its changed
+       corruptors. The modification is left out if no corruptor can be
+       selected, or if it would modify the attribute more than
+       'max_num_mod_per_attr' times or more than 'num_mod_per_rec'
+       attributes of the duplicate. The other attributes are modified with
+       the same corruptors and random values as before, so only the values of
+       the changed attributes are different (and of attributes modified by a
+       record level corruptor after a changed attribute). As in 'apply_plan'
+       the duplicates are not checked again to be different.
+    """
+
+    if (self.random_seed == None):
+      raise Exception, 'Configuration changes can only be applied if a ' + \
+                       '"random_seed" is given'
+
+    if ((plan.random_seed != self.random_seed) or \
+        (plan.attribute_name_list != self.attribute_name_list)):
+      raise Exception, 'Plan was made with a different seed or attributes'
+
+    if (plan.attr_config_dict == {}):
+      raise Exception, 'Plan does not contain the corruptors of attributes'
+
+    # Find the attributes with changed (or added or removed) corruptors
+    #
+    attr_config_dict = self.__attr_config_dict__()
+
+    changed_attr_index_set = set()
+    for attr_name in set(plan.attr_config_dict.keys() + \
+                         attr_config_dict.keys()):
+      if (plan.attr_config_dict.get(attr_name) != \
+          attr_config_dict.get(attr_name)):
+        changed_attr_index_set.add(self.attribute_name_list.index(attr_name))
+
+    chunk_size = 10000  # Number of duplicates of the plan processed together
+
+    self.num_dup_rec_created = 0  # Number of duplicates generated again
+
+    self.__reset_corruptor_stats__()
+
+    self.corruption_plan = self.__new_plan__()
+
+    new_dup_rec_list = []
+
+    self.__open_event_log__()
+    try:
+      for start_i in xrange(0, plan.num_duplicates(), chunk_size):
+        end_i = min(start_i+chunk_size, plan.num_duplicates())
+
+        new_dup_rec_list += self.__apply_config_chunk__(plan, rec_dict,
+                                                        start_i, end_i,
+                                                        changed_attr_index_set)
+        self.__write_events__()
+    finally:
+      self.__close_event_log__()
+
+    for (dup_rec_id, dup_rec_list) in new_dup_rec_list:
+      rec_dict[dup_rec_id] = dup_rec_list
+
+    if (self.verbose == True):
+      changed_attr_name_list = []
+      for attr_index in sorted(changed_attr_index_set):
+        changed_attr_name_list.append(self.attribute_name_list[attr_index])
+      print 'Attributes with changed corruptors: %s' % \
+            (', '.join(changed_attr_name_list))
+      print '%d of %d duplicate records generated again' % \
+            (self.num_dup_rec_created, plan.num_duplicates())
+      print
+
+    return rec_dict
+
+  # ---------------------------------------------------------------------------
+
+  def __apply_config_chunk__(self, plan, rec_dict, start_i, end_i,
+                             changed_attr_index_set):
+    """Helper method which generates again the duplicates of the given plan
+       from index 'start_i' up to (excluding) 'end_i' that have modifications
+       of the attributes with the given indices (see 'apply_config_changes'),
+       adds all these duplicates to the new plan, and returns the duplicates
+       generated again as a list of pairs (duplicate record identifier,
+       duplicate record list).
+    """
+
+    dup_try_list =  []  # Tries of the duplicates generated again
+    plan_dup_list = []  # All duplicates for the new plan
+    org_state =     None
+
+    for dup_i in xrange(start_i, end_i):
+      (org_rec_id, dup_num, dup_try, mod_list) = plan.get_duplicate(dup_i)
+      org_digest = plan.org_digest_list[plan.dup_org_array[dup_i]]
+
+      is_changed = False
+      for (attr_index, crpt_index) in mod_list:
+        if (attr_index in changed_attr_index_set):
+          is_changed = True
+          break
+
+      if (is_changed == False):
+        plan_dup_list.append((org_rec_id, dup_num, dup_try, mod_list,
+                              org_digest))
+        continue
+
+      if ((org_state == None) or (org_state['org_rec_id'] != org_rec_id)):
+        if (org_rec_id not in rec_dict):
+          raise Exception, 'Original record "%s" of plan not given' % \
+                           (org_rec_id)
+        org_state = {'org_rec_id':        org_rec_id,
+                     'rec_list':          rec_dict[org_rec_id],
+                     'dup_rec_id_prefix': self.__dup_rec_id_prefix__( \
+                                                               org_rec_id)}
+
+      # The modifications of the plan are followed, and those applied are
+      # listed in the try (the list is added to the new plan once complete)
+      #
+      dup_try_dict = self.__start_dup_try__(org_state, dup_num, dup_try)
+      dup_try_dict['plan_mod_list'] = mod_list
+      dup_try_dict['plan_mod_i'] =    0
+      dup_try_dict['config_rng'] =    self.__stream__(org_rec_id, dup_num,
+                                                      dup_try, 'config')
+      dup_try_list.append(dup_try_dict)
+
+      plan_dup_list.append((org_rec_id, dup_num, dup_try,
+                            dup_try_dict['mod_list'], org_digest))
+
+    # In each round the next modification of each duplicate is applied
+    #
+    mod_try_list = dup_try_list
+
+    while (mod_try_list != []):
+      corruptor_list = []  # The corruptors used, in order of the duplicates
+      work_dict =      {}  # For each corruptor the values to be modified
+
+      for dup_try_dict in mod_try_list:
+        mod_select = self.__next_config_modification__(dup_try_dict,
+                                                       changed_attr_index_set)
+        if (mod_select == None):  # No modification of the plan left
+          continue
+
+        (mod_attr_name, attr_index, crpt_index, corruptor_method) = mod_select
+
+        dup_try_dict['mod_list'].append((attr_index, crpt_index))
+
+        if (corruptor_method not in work_dict):
+          corruptor_list.append(corruptor_method)
+          work_dict[corruptor_method] = []
+        work_dict[corruptor_method].append((dup_try_dict, mod_attr_name,
+                                            attr_index, crpt_index))
+
+      self.__corrupt_batches__(corruptor_list, work_dict)
+
+      next_mod_try_list = []
+      for dup_try_dict in mod_try_list:
+        if (dup_try_dict['plan_mod_i'] < len(dup_try_dict['plan_mod_list'])):
+          next_mod_try_list.append(dup_try_dict)
+      mod_try_list = next_mod_try_list
+
+    for plan_dup in plan_dup_list:
+      self.corruption_plan.add_duplicate(*plan_dup)
+
+    new_dup_rec_list = []
+
+    for dup_try_dict in dup_try_list:
+      new_dup_rec_list.append((dup_try_dict['dup_rec_id'],
+                               self.__dup_rec_list__(dup_try_dict)))
+      self.__add_events__(dup_try_dict)
+
+    self.num_dup_rec_created += len(new_dup_rec_list)
+
+    return new_dup_rec_list
+
+  # ---------------------------------------------------------------------------
+
+  def __can_add_config_modification__(self, dup_try_dict, attr_index,
+                                      changed_attr_index_set):
+    """Helper method which returns True if the changed attribute with the
+       given index can be modified once more in the given try: if it was
+       modified fewer than 'max_num_mod_per_attr' times, and if modifying it
+       leaves room within 'num_mod_per_rec' modified attributes for all
+       attributes not modified so far that the plan still modifies with
+       unchanged corruptors.
+    """
+
+    attr_mod_count_list = dup_try_dict['attr_mod_count_list']
+
+    if (attr_mod_count_list[attr_index] >= self.max_num_mod_per_attr):
+      return False
+
+    if (attr_mod_count_list[attr_index] > 0):
+      return True  # It is counted as a modified attribute already
+
+    later_attr_index_set = set()
+    for (later_attr_index, crpt_index) in \
+        dup_try_dict['plan_mod_list'][dup_try_dict['plan_mod_i']:]:
+      if ((later_attr_index not in changed_attr_index_set) and \
+          (attr_mod_count_list[later_attr_index] == 0)):
+        later_attr_index_set.add(later_attr_index)
+
+    return (dup_try_dict['num_mod_in_record'] + len(later_attr_index_set) < \
+            self.num_mod_per_rec)
+
+  # ---------------------------------------------------------------------------
+
+  def __next_config_modification__(self, dup_try_dict, changed_attr_index_set):
+    """Helper method which returns the next modification of the plan to be
+       applied to the given try (see '__apply_config_chunk__'), with a new
+       corruptor if its attribute is one of the changed attributes, as a tuple
+       (attribute name, attribute index, corruptor index, corruptor), or None
+       if no modification of the plan is left.
+    """
+
+    plan_mod_list = dup_try_dict['plan_mod_list']
+
+    while (dup_try_dict['plan_mod_i'] < len(plan_mod_list)):
+      (attr_index, crpt_index) = plan_mod_list[dup_try_dict['plan_mod_i']]
+      dup_try_dict['plan_mod_i'] += 1
+
+      attr_name = self.attribute_name_list[attr_index]
+
+      if (attr_index not in changed_attr_index_set):
+        return (attr_name, attr_index, crpt_index,
+                self.attr_mod_data_dict[attr_name][crpt_index][1])
+
+      if ((attr_name in self.crpt_sampler_dict) and \
+          (self.__can_add_config_modification__(dup_try_dict, attr_index,
+                                      changed_attr_index_set) == True)):
+        crpt_select = self.__select_corruptor__(dup_try_dict, attr_name,
+                                       attr_index,
+                                       self.crpt_sampler_dict[attr_name],
+                                       dup_try_dict['config_rng'])
+        if (crpt_select != None):
+          (crpt_index, corruptor_method) = crpt_select
+          return (attr_name, attr_index, crpt_index, corruptor_method)
+
+    return None
+
+  # ---------------------------------------------------------------------------
+
+  def __new_unique_filter__(self):
+    """Helper method which creates an empty Bloom filter for the original
+       records and duplicates of a run if 'unique_records' is True.
+    """
+
+    self.num_unique_collisions = 0
+
+    if (self.unique_records == True):
+      self.unique_filter = bloomfilter.BloomFilter(self.number_of_org_records +
+                                                   self.number_of_mod_records,
+                                                   self.unique_error_rate)
+    else:
+      self.unique_filter = None
+
+  # ---------------------------------------------------------------------------
+
+  def __print_unique_collisions__(self):
+    """Helper method which prints how many duplicates were generated again
+       because they were the same as another record.
+    """
+
+    if (self.unique_records == True):
+      print '%d duplicates were the same as another record (or a false ' % \
+            (self.num_unique_collisions) + 'positive of the Bloom filter) ' + \
+            'and were generated again'
+      print
+
+  # ---------------------------------------------------------------------------
+
+  def __print_shortfalls__(self):
+    """Helper method which prints the original records for which fewer
+       duplicates than assigned were generated.
+    """
+
+    if (self.shortfall_list == []):
+      return
+
+    num_dups_short = 0
+    for (org_rec_id, num_dups, num_dups_created) in self.shortfall_list:
+      num_dups_short += num_dups - num_dups_created
+
+    print 'Warning: %d duplicates could not be generated for %d original ' % \
+          (num_dups_short, len(self.shortfall_list)) + 'records:'
+    for (org_rec_id, num_dups, num_dups_created) in self.shortfall_list:
+      print '  %s: %d of %d duplicates' % (org_rec_id, num_dups_created,
+                                           num_dups)
+    print
+
+  # ---------------------------------------------------------------------------
+
+  def estimate_num_variants(self, rec_list):
+    """Method which returns an estimate of the number of different
+       duplicates that can be generated for the given original record list,
+       or None if this is not known (because a corruptor does not know how
+       many different values it can return, see 'num_variants' of the
+       corruptors).
+
+       For each attribute that can be modified, the numbers of different
+       values of all its corruptors are added, and for up to
+       'max_num_mod_per_attr' modifications of the attribute multiplied. The
+       estimate is the number of ways to modify between 1 and
+       'num_mod_per_rec' of the attributes. It ignores that different
+       modifications can lead to the same duplicate.
+    """
+
+    attr_num_var_list = []
+
+    for (attr_name, attr_index) in self.mod_attr_list:
+      if (attr_name == 'crptr-record'):
+        attr_val = rec_list
+      else:
+        attr_val = rec_list[attr_index]
+
+      num_val_var = 0  # Number of different values of one modification
+      for (crpt_prob, corruptor) in self.attr_mod_data_dict[attr_name]:
+        if (crpt_prob > 0.0):
+          num_crpt_var = corruptor.num_variants(attr_val)
+          if (num_crpt_var == None):
+            return None
+          num_val_var += num_crpt_var
+
+      attr_num_var = 0
+      for num_attr_mod in xrange(1, self.max_num_mod_per_attr+1):
+        attr_num_var += num_val_var ** num_attr_mod
+      attr_num_var_list.append(attr_num_var)
+
+    # The number of ways to modify exactly j of the attributes, for j from 0
+    # to 'num_mod_per_rec'
+    #
+    num_var_list = [1] + [0] * self.num_mod_per_rec
+
+    for attr_num_var in attr_num_var_list:
+      for j in xrange(self.num_mod_per_rec, 0, -1):
+        num_var_list[j] += num_var_list[j-1] * attr_num_var
+
+    return sum(num_var_list[1:])
+
+  # ---------------------------------------------------------------------------
+
+  def analyse_variants(self, rec_dict):
+    """Method which checks before a run for which original records in the
+       given record dictionary fewer than 'max_num_dup_per_rec' different
+       duplicates can be generated (see 'estimate_num_variants'). Such records
+       are likely to get fewer duplicates than assigned to them.
+
+       Returns a list of pairs (original record identifier, estimated number
+       of different duplicates) of these records.
+    """
+
+    few_var_list = []
+    num_unknown =  0  # Number of records without an estimate
+
+    for (org_rec_id, rec_list) in rec_dict.iteritems():
+      num_variants = self.estimate_num_variants(rec_list)
+
+      if (num_variants == None):
+        num_unknown += 1
+      elif (num_variants < self.max_num_dup_per_rec):
+        few_var_list.append((org_rec_id, num_variants))
+
+    few_var_list.sort()
+
+    if (self.verbose == True):
+      print '%d of %d original records can have fewer than %d different ' % \
+            (len(few_var_list), len(rec_dict), self.max_num_dup_per_rec) + \
+            'duplicates'
+      if (num_unknown > 0):
+        print '  (no estimate for %d records)' % (num_unknown)
+      for (org_rec_id, num_variants) in few_var_list:
+        print '  %s: %d different duplicates' % (org_rec_id, num_variants)
+      print
+
+    return few_var_list
+
+  # ---------------------------------------------------------------------------
+
+  def corruptor_stats(self):
+    """Method which returns the number of attempts of each corruptor on each
+       attribute in the last run, as a list of tuples (attribute name,
+       corruptor name, number of attempts, number of wasted attempts where
+       the value was not changed, True if the corruptor was dropped), in the
+       order of 'attribute_name_list' and of the corruptors of each
+       attribute. This can help to tune 'attr_mod_data_dict'.
+    """
+
+    stats_list = []
+
+    for attr_name in self.attribute_name_list:
+      if (attr_name not in self.attr_mod_data_dict):
+        continue
+
+      for (crpt_index, (crpt_prob, corruptor)) in \
+          enumerate(self.attr_mod_data_dict[attr_name]):
+        (num_attempts, num_unchanged) = \
+                           self.corruptor_stats_dict[attr_name][crpt_index]
+        stats_list.append((attr_name, corruptor.name, num_attempts,
+                           num_unchanged,
+                           crpt_index in self.dropped_crpt_dict[attr_name]))
+
+    return stats_list
+
+  # ---------------------------------------------------------------------------
+
+  def __print_corruptor_stats__(self):
+    """Helper method which prints the attempts of the corruptors.
+    """
+
+    print 'Attempts of corruptors (attribute, corruptor, attempts, wasted ' + \
+          'attempts):'
+    for (attr_name, crpt_name, num_attempts, num_unchanged, dropped) in \
+        self.corruptor_stats():
+      if (dropped == True):
+        drop_str = ' (dropped)'
+      else:
+        drop_str = ''
+      print '  %s, %s: %d, %d%s' % (attr_name, crpt_name, num_attempts,
+                                    num_unchanged, drop_str)
+    print
+
+  # ---------------------------------------------------------------------------
+
+  def __reset_corruptor_stats__(self, checkpoint_dict=None):
+    """Helper method which sets the number of attempts of all corruptors to
+       0 and drops no corruptor, or takes them from the given checkpoint.
+    """
+
+    if (checkpoint_dict != None):
+      self.corruptor_stats_dict = checkpoint_dict['corruptor_stats']
+      self.dropped_crpt_dict =    checkpoint_dict['dropped_crpt']
+      return
+
+    # For each attribute a list with a pair (number of attempts, number of
+    # attempts where the value was not changed) for each corruptor, and the
+    # set of the indices of the dropped corruptors
+    #
+    self.corruptor_stats_dict = {}
+    self.dropped_crpt_dict =    {}
+
+    for (attr_name, attr_mod_data_list) in self.attr_mod_data_dict.items():
+      self.corruptor_stats_dict[attr_name] = []
+      for crpt_data in attr_mod_data_list:
+        self.corruptor_stats_dict[attr_name].append([0, 0])
+      self.dropped_crpt_dict[attr_name] = set()
+
+  # ---------------------------------------------------------------------------
+
+  def __count_attempt__(self, attr_name, crpt_index, changed):
+    """Helper method which counts an attempt of the given corruptor on the
+       given attribute, and drops the corruptor if its success rate is too
+       low.
+    """
+
+    crpt_stats = self.corruptor_stats_dict[attr_name][crpt_index]
+
+    crpt_stats[0] += 1
+    if (changed == False):
+      crpt_stats[1] += 1
+
+    if ((self.min_success_rate != None) and \
+        (crpt_stats[0] >= self.min_success_attempts)):
+      self.__check_success_rate__(attr_name, crpt_index)
+
+  # ---------------------------------------------------------------------------
+
+  def __check_success_rate__(self, attr_name, crpt_index):
+    """Helper method which drops the given corruptor for the given attribute
+       if its success rate is below 'min_success_rate', unless it is the last
+       corruptor of the attribute that is not dropped.
+    """
+
+    dropped_crpt_set = self.dropped_crpt_dict[attr_name]
+
+    if (crpt_index in dropped_crpt_set):
+      return
+
+    (num_attempts, num_unchanged) = \
+                           self.corruptor_stats_dict[attr_name][crpt_index]
+
+    if (float(num_attempts - num_unchanged) / num_attempts >= \
+        self.min_success_rate):
+      return
+
+    num_crpt_left = 0
+    for (i, (crpt_prob, corruptor)) in \
+        enumerate(self.attr_mod_data_dict[attr_name]):
+      if ((crpt_prob > 0.0) and (i not in dropped_crpt_set)):
+        num_crpt_left += 1
+    if (num_crpt_left <= 1):
+      return
+
+    dropped_crpt_set.add(crpt_index)
+
+    if (self.verbose == True):
+      print 'Corruptor "%s" dropped for attribute "%s": %d of %d ' % \
+            (self.attr_mod_data_dict[attr_name][crpt_index][1].name,
+             attr_name, num_unchanged, num_attempts) + \
+            'attempts did not change the value'
+
+  # ---------------------------------------------------------------------------
+
+  def __copy_corruptor_stats__(self):
+    """Helper method which returns a copy of the attempts of the corruptors.
+    """
+
+    stats_copy_dict = {}
+    for (attr_name, crpt_stats_list) in self.corruptor_stats_dict.items():
+      stats_copy_dict[attr_name] = [crpt_stats[:] for crpt_stats in
+                                    crpt_stats_list]
+
+    return stats_copy_dict
+
+  # ---------------------------------------------------------------------------
+
+  def __add_corruptor_stats__(self, stats_dict, sub_stats_dict=None):
+    """Helper method which adds the attempts in the given dictionary (minus
+       the attempts in the second dictionary, if given) to the attempts of the
+       corruptors.
+    """
+
+    for (attr_name, crpt_stats_list) in stats_dict.items():
+      for crpt_index in xrange(len(crpt_stats_list)):
+        crpt_stats = self.corruptor_stats_dict[attr_name][crpt_index]
+        for i in [0, 1]:
+          crpt_stats[i] += crpt_stats_list[crpt_index][i]
+          if (sub_stats_dict != None):
+            crpt_stats[i] -= sub_stats_dict[attr_name][crpt_index][i]
+
+        if ((self.min_success_rate != None) and \
+            (crpt_stats[0] >= self.min_success_attempts)):
+          self.__check_success_rate__(attr_name, crpt_index)
+
+  # ---------------------------------------------------------------------------
+
+  def __corruptor_name_dict__(self):
+    """Helper method which returns a dictionary with the list of the names
+       of the corruptors of each attribute.
+    """
+
+    corruptor_name_dict = {}
+    for (attr_name, attr_mod_data_list) in self.attr_mod_data_dict.items():
+      corruptor_name_dict[attr_name] = []
+      for (crpt_prob, corruptor) in attr_mod_data_list:
+        corruptor_name_dict[attr_name].append(corruptor.name)
+
+    return corruptor_name_dict
+
+  # ---------------------------------------------------------------------------
+
+  def __new_plan__(self):
+    """Helper method which returns an empty plan for this data set corruptor.
+    """
+
+    return corruptionplan.CorruptionPlan(self.attribute_name_list,
+                                         self.__corruptor_name_dict__(),
+                                         self.random_seed,
+                                         self.__attr_config_dict__())
+
+  # ---------------------------------------------------------------------------
+
+  def __attr_config_dict__(self):
+    """Helper method which returns a dictionary with the digest of the
+       corruptors of each attribute (see 'corruptionplan.attr_config_digest').
+    """
+
+    attr_config_dict = {}
+    for (attr_name, attr_mod_data_list) in self.attr_mod_data_dict.items():
+      attr_config_dict[attr_name] = \
+                      corruptionplan.attr_config_digest(attr_mod_data_list)
+
+    return attr_config_dict
+
+  # ---------------------------------------------------------------------------
+
+  def __check_plan__(self, plan):
+    """Helper method which checks the given plan can be applied with the
+       settings of this data set corruptor.
+    """
+
+    if (self.random_seed == None):
+      raise Exception, 'A plan can only be applied if a "random_seed" is ' + \
+                       'given'
+
+    if ((plan.random_seed != self.random_seed) or \
+        (plan.attribute_name_list != self.attribute_name_list) or \
+        (plan.corruptor_name_dict != self.__corruptor_name_dict__())):
+      raise Exception, 'Plan was made with a different seed, attributes ' + \
+                       'or corruptors'
+
+# =============================================================================
+
+class CorruptionEventLog:
+  """Class which writes corruption events into a file as JSON lines (one JSON
+     object per line). Each event is a dictionary with the keys 'org_rec_id',
+     'dup_rec_id', 'attribute', 'corruptor', 'org_val' (the value before the
+     modification), 'new_val' (the value after the modification), 'num_tries'
+     (the number of tries to modify the duplicate so far) and 'dup_try' (the
+     number of earlier tries to generate the duplicate).
+
+     Events are buffered and only written once 'buffer_size' events have been
+     collected, or when the log is closed.
+  """
+
+  # ---------------------------------------------------------------------------
+
+  def __init__(self, file_name, buffer_size=10000, resume_offset=None):
+    """Constructor, open the event log file for writing. If a resume offset
+       is given, the events up to this offset in the file are kept, and all
+       later events are removed.
+    """
+
+    basefunctions.check_is_non_empty_string('file_name', file_name)
+    basefunctions.check_is_integer('buffer_size', buffer_size)
+    basefunctions.check_is_positive('buffer_size', buffer_size)
+
+    try:
+      if (resume_offset == None):
+        self.out_file = open(file_name, 'w')
+      else:
+        self.out_file = open(file_name, 'r+')
+        self.out_file.seek(resume_offset)
+        self.out_file.truncate()
+    except:
+      raise IOError, 'Cannot write event log file "%s"' % (file_name)
+
+    self.buffer_size = buffer_size
+    self.line_list =   []  # Buffered JSON lines
+
+  # ---------------------------------------------------------------------------
+
+  def add_events(self, event_list):
+    """Add the events in the given list to the log.
+    """
+
+    for event_dict in event_list:
+      self.line_list.append(json.dumps(event_dict, sort_keys=True))
+
+    if (len(self.line_list) >= self.buffer_size):
+      self.flush()
+
+  # ---------------------------------------------------------------------------
+
+  def flush(self):
+    """Write all buffered events into the file.
+    """
+
+    if (self.line_list != []):
+      self.out_file.write('\n'.join(self.line_list)+'\n')
+      self.line_list = []
+
+  # ---------------------------------------------------------------------------
+
+  def sync(self):
+    """Write all buffered events to disk, and return the current offset in
+       the file.
+    """
+
+    self.flush()
+    self.out_file.flush()
+    os.fsync(self.out_file.fileno())
+
+    return self.out_file.tell()
+
+  # ---------------------------------------------------------------------------
+
+  def close(self):
+    """Write all buffered events and close the file.
+    """
+
+    self.flush()
+    self.out_file.close()
+
+# =============================================================================
+
+worker_data_set = None  # Data set corruptor and record dictionary used by
+worker_rec_dict = None  # the worker processes of a parallel corruption
+
+def corrupt_record_chunk_worker(org_rec_dup_list):
+  """Function run in a worker process to generate the duplicates for one
+     chunk of original records (see 'CorruptDataSet.corrupt_records').
+  """
+
+  worker_data_set.event_log =     None  # Events are returned to the parent
+  worker_data_set.event_list =    []
+  worker_data_set.plan_dup_list = []
+
+  start_stats_dict = worker_data_set.__copy_corruptor_stats__()
+
+  chunk_dup_rec_list = worker_data_set.__corrupt_record_chunk__( \
+                                           worker_rec_dict, org_rec_dup_list)
+
+  return (chunk_dup_rec_list, worker_data_set.event_list,
+          worker_data_set.plan_dup_list, start_stats_dict,
+          worker_data_set.corruptor_stats_dict)
+
+# =============================================================================
+
+def corrupt_scenarios(scenario_list, rec_dict, header_list, unicode_encoding,
+                      num_processes=1):
+  """Function which corrupts the same original records according to several
+     scenarios, each given as a pair (data set corruptor, output file name),
+     and writes the original records and duplicates of each scenario into its
+     own CSV file, sorted by record identifier (the first column, which has
+     to be named first in the given header list).
+
+     The records only need to be read, and the corruptors (with their look-up
+     tables) only constructed once: the data set corruptors of the scenarios
+     can share corruptor objects, for example with different probabilities,
+     numbers of duplicates or seeds. Each scenario corrupts its own copy of
+     the record dictionary, which shares the original record lists (they are
+     not modified).
+
+     With 'num_processes' larger than 1 the scenarios are run in a pool of
+     worker processes, which are forked after the scenarios and records have
+     been made available as module variables, so they are shared with the
+     workers rather than being pickled. Each scenario then needs a
+     'random_seed' (so its result does not depend on the worker it runs in)
+     and has to use a single process.
+
+     Returns a list with a pair (number of duplicates generated,
+     'shortfall_list') for each scenario.
+  """
+
+  global worker_scenario_list, worker_rec_dict
+
+  basefunctions.check_is_list('scenario_list', scenario_list)
+  basefunctions.check_is_dictionary('rec_dict', rec_dict)
+  basefunctions.check_is_list('header_list', header_list)
+  basefunctions.check_is_integer('num_processes', num_processes)
+  basefunctions.check_is_positive('num_processes', num_processes)
+
+  for scenario in scenario_list:
+    basefunctions.check_is_tuple('scenario_list element', scenario)
+    assert len(scenario) == 2, 'scenario_list element does not consist ' + \
+                               'of two elements'
+    (data_set_corruptor, out_file_name) = scenario
+    basefunctions.check_is_non_empty_string('output file name',
+                                            out_file_name)
+
+    if (num_processes > 1):
+      if (data_set_corruptor.random_seed == None):
+        raise Exception, 'A "random_seed" must be given for every ' + \
+                         'scenario when more than one process is used'
+      if (data_set_corruptor.num_processes > 1):
+        raise Exception, 'Scenarios cannot use more than one process ' + \
+                         'when they are run in more than one process'
+
+  if (num_processes == 1):
+    result_list = []
+    for scenario_i in xrange(len(scenario_list)):
+      result_list.append(corrupt_scenario(scenario_list[scenario_i],
+                                          rec_dict, header_list,
+                                          unicode_encoding))
+    return result_list
+
+  worker_scenario_list = (scenario_list, header_list, unicode_encoding)
+  worker_rec_dict =      rec_dict
+
+  pool = multiprocessing.Pool(min(num_processes, len(scenario_list)))
+  try:
+    result_list = pool.map(corrupt_scenario_worker,
+                           range(len(scenario_list)), 1)
+    pool.close()
+  except:
+    pool.terminate()
+    raise
+  finally:
+    pool.join()
+    worker_scenario_list = None
+    worker_rec_dict =      None
+
+  return result_list
+
+# -----------------------------------------------------------------------------
+
+def corrupt_scenario(scenario, rec_dict, header_list, unicode_encoding):
+  """Function which corrupts a copy of the given record dictionary according
+     to the given scenario and writes it into the output file of the scenario
+     (see 'corrupt_scenarios').
+  """
+
+  (data_set_corruptor, out_file_name) = scenario
+
+  scenario_rec_dict = data_set_corruptor.corrupt_records(dict(rec_dict))
+
+  rec_id_list = scenario_rec_dict.keys()
+  rec_id_list.sort()
+
+  rec_list = []
+  for rec_id in rec_id_list:
+    rec_list.append([rec_id] + scenario_rec_dict[rec_id])
+
+  basefunctions.write_csv_file(out_file_name, unicode_encoding, header_list,
+                               rec_list)
+
+  return (data_set_corruptor.num_dup_rec_created,
+          data_set_corruptor.shortfall_list)
+
+# -----------------------------------------------------------------------------
+
+worker_scenario_list = None  # Scenarios, header and encoding used by the
+                             # worker processes of 'corrupt_scenarios'
+
+def corrupt_scenario_worker(scenario_i):
+  """Function run in a worker process to corrupt the records according to
+     one scenario (see 'corrupt_scenarios').
+  """
+
+  (scenario_list, header_list, unicode_encoding) = worker_scenario_list
+
+  return corrupt_scenario(scenario_list[scenario_i], worker_rec_dict,
+                          header_list, unicode_encoding)
 
-# =============================================================================
\ No newline at end of file
+# =============================================================================
@@ -0,0 +1,84 @@
+# -----------------------------------------------------------------------------
+# Import necessary modules
+
+import hashlib
+import random
+import threading
+
+# =============================================================================
+# Keyed random streams, so that the random values used to corrupt one value
+# only depend on a seed and a key (such as the original record identifier,
+# the duplicate number and the attribute name), and not on all values that
+# were corrupted before.
+#
+# Corruptors and position functions draw their random values from the active
+# stream of the current thread (see 'get_stream'). Unless a stream has been
+# set with 'set_stream', this is the 'random' module itself, so data sets that
+# are generated without a seed behave exactly as before.
+
+active_stream = threading.local()  # Holds the active stream of each thread
+
+# -----------------------------------------------------------------------------
+
+def derive_seed(seed, *key_list):
+  """Calculate a seed from the given seed and key values (strings or numbers).
+     The same seed is returned for the same arguments in every process and on
+     every platform.
+  """
+
+  key_str = '\x00'.join([str(seed)] + [str(key) for key in key_list])
+
+  return int(hashlib.md5(key_str).hexdigest(), 16)
+
+# -----------------------------------------------------------------------------
+
+def keyed_stream(seed, *key_list):
+  """Return a new random generator for the stream identified by the given seed
+     and key values. It provides all methods of the 'random' module, such as
+     random(), choice(), randint(), gauss() and sample().
+  """
+
+  return random.Random(derive_seed(seed, *key_list))
+
+# -----------------------------------------------------------------------------
+
+def get_stream():
+  """Return the random stream corruptors of the current thread should use.
+  """
+
+  return getattr(active_stream, 'stream', random)
+
+# -----------------------------------------------------------------------------
+
+def set_stream(stream):
+  """Set the random stream used by corruptors in the current thread, and return
+     the stream that was active before. Setting the stream to None restores
+     the 'random' module as the active stream.
+  """
+
+  prev_stream = get_stream()
+
+  if (stream == None):
+    stream = random
+  active_stream.stream = stream
+
+  return prev_stream
+
+# -----------------------------------------------------------------------------
+
+def stream_list(rng_list, num_values):
+  """Return the list of random streams to corrupt a batch of 'num_values'
+     values with, which is the given list, or the active stream for every
+     value if the given list is None.
+  """
+
+  if (rng_list == None):
+    return [get_stream()] * num_values
+
+  if (len(rng_list) != num_values):
+    raise Exception, 'Number of random streams (%d) differs from number ' % \
+                     (len(rng_list)) + 'of values (%d)' % (num_values)
+
+  return rng_list
+
+# =============================================================================
@@ -0,0 +1,226 @@
+# -----------------------------------------------------------------------------
+# Import necessary modules
+
+import math
+
+import basefunctions
+
+# =============================================================================
+# Distributions of the number of duplicates generated for one original record
+#
+# Each distribution is a function with the arguments:
+#
+#   max_num_dup_per_rec  The maximum number of duplicates for one record.
+#
+#   num_dup_rate         The number of duplicates to be generated divided by
+#                        the number of original records.
+#
+#   param_dict           A dictionary with the parameters of the distribution
+#                        (the 'num_dup_dist_params' of a data set corruptor).
+#
+# which returns a list of 'max_num_dup_per_rec' non-negative weights, where
+# the weight at index i is the likelihood that an original record gets i+1
+# duplicates (the weights do not need to sum to 1.0). All distributions only
+# need time in the order of 'max_num_dup_per_rec' to set up.
+#
+# New distributions can be added with 'register_num_dup_dist'.
+
+def check_param_dict(dist_name, param_dict, param_name_list):
+  """Check that the given parameter dictionary only contains parameters listed
+     in the given list.
+  """
+
+  basefunctions.check_is_dictionary('param_dict', param_dict)
+
+  for param_name in param_dict:
+    if (param_name not in param_name_list):
+      raise Exception, 'Illegal parameter for "%s" distribution: "%s"' % \
+                       (dist_name, str(param_name))
+
+# -----------------------------------------------------------------------------
+
+def uniform_num_dup_dist(max_num_dup_per_rec, num_dup_rate, param_dict):
+  """Every number of duplicates is equally likely. No parameters.
+  """
+
+  check_param_dict('uniform', param_dict, [])
+
+  return [1.0] * max_num_dup_per_rec
+
+# -----------------------------------------------------------------------------
+
+def poisson_num_dup_dist(max_num_dup_per_rec, num_dup_rate, param_dict):
+  """The number of duplicates minus one follows a Poisson distribution.
+
+     Parameters:
+     mean  The mean (lambda) of the Poisson distribution. Default is 1.0 plus
+           the number of duplicates per original record.
+  """
+
+  check_param_dict('poisson', param_dict, ['mean'])
+
+  mean = param_dict.get('mean', 1.0 + num_dup_rate)
+  basefunctions.check_is_positive('mean', mean)
+
+  # Calculate each Poisson number from the previous one, which avoids the
+  # factorial
+  #
+  poisson_num = math.exp(-mean)
+  weight_list = [poisson_num]
+
+  for i in range(1, max_num_dup_per_rec):
+    poisson_num = poisson_num * mean / i
+    weight_list.append(poisson_num)
+
+  return weight_list
+
+# -----------------------------------------------------------------------------
+
+def zipf_num_dup_dist(max_num_dup_per_rec, num_dup_rate, param_dict):
+  """The likelihood of i duplicates is proportional to 1 / i**(1-theta).
+
+     Parameters:
+     theta  The Zipf parameter, a value between 0.0 and 1.0 (default 0.5).
+  """
+
+  check_param_dict('zipf', param_dict, ['theta'])
+
+  zipf_theta = param_dict.get('theta', 0.5)
+  basefunctions.check_is_normalised('theta', zipf_theta)
+
+  weight_list = []
+  for i in range(max_num_dup_per_rec):
+    weight_list.append(1.0 / ((i+1) ** (1.0 - zipf_theta)))
+
+  return weight_list
+
+# -----------------------------------------------------------------------------
+
+def geometric_num_dup_dist(max_num_dup_per_rec, num_dup_rate, param_dict):
+  """The likelihood of i duplicates is proportional to (1-prob)**(i-1), the
+     number of tries until the first success with success probability 'prob'.
+
+     Parameters:
+     prob  The success probability, a value between 0.0 and 1.0 (default
+           0.5).
+  """
+
+  check_param_dict('geometric', param_dict, ['prob'])
+
+  geom_prob = param_dict.get('prob', 0.5)
+  basefunctions.check_is_normalised('prob', geom_prob)
+  basefunctions.check_is_positive('prob', geom_prob)
+
+  weight_list = [geom_prob]
+  for i in range(1, max_num_dup_per_rec):
+    weight_list.append(weight_list[-1] * (1.0 - geom_prob))
+
+  return weight_list
+
+# -----------------------------------------------------------------------------
+
+def empirical_num_dup_dist(max_num_dup_per_rec, num_dup_rate, param_dict):
+  """The likelihood of a number of duplicates is taken from a histogram in a
+     CSV file with two columns, the number of duplicates and its count (or
+     weight), for example:
+
+       1,6201
+       2,1873
+       3,302
+
+     Numbers of duplicates not listed in the file have a weight of 0.
+
+     Parameters:
+     file_name         The name of the histogram file (required).
+     has_header_line   A flag, set to True if the file starts with a header
+                       line (default False).
+     unicode_encoding  The Unicode encoding of the file (default 'ascii').
+  """
+
+  check_param_dict('empirical', param_dict, ['file_name', 'has_header_line',
+                                             'unicode_encoding'])
+
+  file_name = param_dict.get('file_name', None)
+  basefunctions.check_is_non_empty_string('file_name', file_name)
+
+  header_list, file_data = \
+             basefunctions.read_csv_file(file_name,
+                                         param_dict.get('unicode_encoding',
+                                                        'ascii'),
+                                         param_dict.get('has_header_line',
+                                                        False))
+
+  weight_list = [0.0] * max_num_dup_per_rec
+
+  for rec_list in file_data:
+    if (len(rec_list) != 2):
+      raise Exception, 'Illegal format in histogram file %s: %s' % \
+                       (file_name, str(rec_list))
+    try:
+      num_dups = int(rec_list[0])
+      weight =   float(rec_list[1])
+    except ValueError:
+      raise Exception, 'Illegal number in histogram file %s: %s' % \
+                       (file_name, str(rec_list))
+
+    if ((num_dups < 1) or (num_dups > max_num_dup_per_rec)):
+      raise Exception, 'Number of duplicates in histogram file %s not ' % \
+                       (file_name) + 'between 1 and %d: %d' % \
+                       (max_num_dup_per_rec, num_dups)
+    basefunctions.check_is_not_negative('weight', weight)
+
+    weight_list[num_dups-1] += weight
+
+  if (sum(weight_list) == 0.0):
+    raise Exception, 'No positive count in histogram file %s' % (file_name)
+
+  return weight_list
+
+# -----------------------------------------------------------------------------
+
+num_dup_dist_dict = {'uniform':   uniform_num_dup_dist,
+                     'poisson':   poisson_num_dup_dist,
+                     'zipf':      zipf_num_dup_dist,
+                     'geometric': geometric_num_dup_dist,
+                     'empirical': empirical_num_dup_dist}
+
+def register_num_dup_dist(dist_name, dist_funct):
+  """Add a distribution (a function as described above) with the given name,
+     so it can be used as 'num_dup_dist' of a data set corruptor.
+  """
+
+  basefunctions.check_is_non_empty_string('dist_name', dist_name)
+  basefunctions.check_is_function_or_method('dist_funct', dist_funct)
+
+  num_dup_dist_dict[dist_name] = dist_funct
+
+# -----------------------------------------------------------------------------
+
+def num_dup_prob_list(dist_name, max_num_dup_per_rec, num_dup_rate,
+                      param_dict):
+  """Return a list of pairs (number of duplicates, probability) for the
+     distribution with the given name, with probabilities that sum to 1.0.
+  """
+
+  if (dist_name not in num_dup_dist_dict):
+    raise Exception, 'Illegal value given for "num_dup_dist": %s' % \
+                     (str(dist_name))
+
+  weight_list = num_dup_dist_dict[dist_name](max_num_dup_per_rec,
+                                             num_dup_rate, param_dict)
+
+  if (len(weight_list) != max_num_dup_per_rec):
+    raise Exception, 'Distribution "%s" returned %d instead of %d weights' % \
+                     (dist_name, len(weight_list), max_num_dup_per_rec)
+  weight_sum = float(sum(weight_list))
+  if (weight_sum <= 0.0):
+    raise Exception, 'Distribution "%s" has no positive weight' % (dist_name)
+
+  prob_list = []
+  for i in range(max_num_dup_per_rec):
+    basefunctions.check_is_not_negative('weight', weight_list[i])
+    prob_list.append((i+1, weight_list[i] / weight_sum))
+
+  return prob_list
+
+# =============================================================================
@@ -1,5 +1,5 @@
 # Import necessary modules
-import random
+import keyedrandom
 
 # =============================================================================
 # Helper functions to randomly select a position for where to apply a
@@ -11,12 +11,14 @@ def position_mod_uniform(in_str):
      Return 0 is the string is empty.
   """
 
+  rng = keyedrandom.get_stream()  # Random stream to draw values from
+
   if (in_str == ''):  # Empty input string
     return 0
 
   max_pos = len(in_str)-1
 
-  pos = random.randint(0, max_pos)  # String positions start at 0
+  pos = rng.randint(0, max_pos)  # String positions start at 0
 
   return pos
 
@@ -35,6 +37,8 @@ def position_mod_normal(in_str):
      Return 0 is the string is empty.
   """
 
+  rng = keyedrandom.get_stream()  # Random stream to draw values from
+
   if (in_str == ''):  # Empty input string
     return 0
 
@@ -44,8 +48,8 @@ def position_mod_normal(in_str):
   std_dev = str_len / 4.0
   max_pos = str_len - 1
 
-  pos = int(round(random.gauss(mid_pos, std_dev)))
+  pos = int(round(rng.gauss(mid_pos, std_dev)))
   while ((pos < 0) or (pos > max_pos)):
-    pos = int(round(random.gauss(mid_pos, std_dev)))
+    pos = int(round(rng.gauss(mid_pos, std_dev)))
 
   return pos
@@ -0,0 +1,75 @@
+# -----------------------------------------------------------------------------
+# Import necessary modules
+
+import collections
+
+import basefunctions
+
+# =============================================================================
+
+class ValueMemo:
+  """Class which keeps what a corruptor computed for a value (such as the
+     candidate modifications at a position in the value), so it is only
+     computed once for values that are repeated many times in an attribute,
+     like occupations, genders or common names.
+
+     At most 'max_size' values are kept. If more values are added the least
+     recently used value is removed. With a 'max_size' of 0 nothing is kept.
+  """
+
+  # ---------------------------------------------------------------------------
+
+  def __init__(self, max_size):
+    """Constructor, create an empty memo for the given number of values.
+    """
+
+    basefunctions.check_is_integer('max_size', max_size)
+    basefunctions.check_is_not_negative('max_size', max_size)
+
+    self.max_size =  max_size
+    self.memo_dict = collections.OrderedDict()  # Least recently used first
+
+    self.num_hits =   0  # Number of results found in the memo
+    self.num_misses = 0  # Number of results computed
+
+  # ---------------------------------------------------------------------------
+
+  def get(self, value, key, compute_funct):
+    """Return what was computed for the given value and key (such as a
+       position in the value), calling compute_funct(value, key) if it is not
+       in the memo. Each value is kept together with all its keys.
+    """
+
+    memo_dict = self.memo_dict
+
+    if (value in memo_dict):
+      key_dict = memo_dict.pop(value)
+    else:
+      key_dict = {}
+
+      if (self.max_size > 0):
+        if (len(memo_dict) >= self.max_size):
+          memo_dict.popitem(last=False)  # Remove least recently used value
+
+    if (self.max_size > 0):
+      memo_dict[value] = key_dict  # Now the most recently used value
+
+    if (key in key_dict):
+      self.num_hits += 1
+      return key_dict[key]
+
+    self.num_misses += 1
+    result = compute_funct(value, key)
+    key_dict[key] = result
+
+    return result
+
+  # ---------------------------------------------------------------------------
+
+  def clear(self):
+    """Remove all values from the memo.
+    """
+
+    self.memo_dict.clear()
+
+# =============================================================================